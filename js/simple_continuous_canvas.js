@@ -15,6 +15,8 @@ var ContinuousVisualization = function(height, width, context) {
                     this.drawLine(p.from_x, p.from_y, p.to_x, p.to_y, p.width, p.Color);
                 if (p.Shape =="arrowHead")
                     this.drawArrrowHead(p.x,p.y,p.angle,p.s,p.Color,p.Filled);
+                if (p.Shape == "heatmap")
+                    this.drawHeatmap(p.rows, p.cols, p.data, p.Color);
     		};
 		};
 	};
@@ -75,12 +77,92 @@ var ContinuousVisualization = function(height, width, context) {
         context.restore();
 	};
 
+	// Cells of opacity ``data`` (base64 bytes, row 0 at the bottom) stretched over the canvas
+	this.drawHeatmap = function(rows, cols, data, color) {
+		var alpha = atob(data);
+		var red = parseInt(color.substr(1, 2), 16);
+		var green = parseInt(color.substr(3, 2), 16);
+		var blue = parseInt(color.substr(5, 2), 16);
+
+		var image = new ImageData(cols, rows);
+		for (var i = 0; i < alpha.length; i++) {
+			image.data[4 * i] = red;
+			image.data[4 * i + 1] = green;
+			image.data[4 * i + 2] = blue;
+			image.data[4 * i + 3] = alpha.charCodeAt(i);
+		}
+		var cells = document.createElement("canvas");
+		cells.width = cols;
+		cells.height = rows;
+		cells.getContext("2d").putImageData(image, 0, 0);
+
+		// The context is flipped vertically, so row 0 lands at the bottom
+		context.imageSmoothingEnabled = false;
+		context.drawImage(cells, 0, 0, width, height);
+	};
+
 	this.resetCanvas = function() {
 		context.clearRect(0, 0, height, width);
 		context.beginPath();
 	};
 };
 
+var DeltaState = function() {
+	this.static = [];
+	this.foods = [];
+	this.ants = {};
+	this.markers = {};  // Per colony, sorted by id
+	this.heatmaps = [];
+	this.palettes = {};
+
+	this.apply = function(frame) {
+		if (frame.full) {
+			this.static = frame.static;
+			this.palettes = frame.palettes;
+			this.foods = [];
+			this.ants = {};
+			this.markers = {};
+			this.heatmaps = [];
+		}
+		if (frame.foods !== undefined)
+			this.foods = frame.foods;
+		if (frame.heatmaps !== undefined)
+			this.heatmaps = frame.heatmaps;
+		for (var id in frame.ants)
+			this.ants[id] = frame.ants[id];
+		for (var i in frame.removed)
+			delete this.ants[frame.removed[i]];
+		for (var c in frame.markers) {
+			var delta = frame.markers[c];
+			var markers = this.markers[c] || [];
+			// Markers expire in the order of their creation
+			var expired = 0;
+			while (expired < markers.length && markers[expired].id < delta.first)
+				expired++;
+			markers = markers.slice(expired);
+			for (var j = 0; j < delta.ids.length; j++)
+				markers.push({
+					"id": delta.ids[j],
+					"Shape": "circle",
+					"Filled": "true",
+					"Color": this.palettes[c][delta.purpose[j]],
+					"r": 1,
+					"x": delta.x[j],
+					"y": delta.y[j],
+				});
+			this.markers[c] = markers;
+		}
+	};
+
+	// Same layers as the frames of ContinuousCanvas without delta
+	this.layers = function() {
+		var markers = this.heatmaps;
+		for (var c in this.markers)
+			markers = markers.concat(this.markers[c]);
+		return {1: this.static.concat(this.foods), 2: markers, 3: Object.values(this.ants)};
+	};
+};
+
 var Simple_Continuous_Module = function(canvas_width, canvas_height, ids) {
 	// Create the element
 	// ------------------
@@ -96,12 +178,23 @@ var Simple_Continuous_Module = function(canvas_width, canvas_height, ids) {
 	var context = canvas.getContext("2d");
 	var canvasDraw = new ContinuousVisualization(canvas_width, canvas_height, context);
 
+	// Objects drawn so far, updated by the frames of ContinuousCanvas(delta=True)
+	var state = new DeltaState();
+
 	this.render = function(data) {
+		if (data.skip)
+			// Throttled frame, the current drawing is kept
+			return;
+		if (data.full !== undefined) {
+			state.apply(data);
+			data = state.layers();
+		}
 		canvasDraw.resetCanvas();
 		canvasDraw.draw(data);
 	};
 
 	this.reset = function() {
+		state = new DeltaState();
 		canvasDraw.resetCanvas();
 	};
 
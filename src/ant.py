@@ -1,13 +1,12 @@
-import random
 import numpy as np
 from typing import Tuple
 from mesa import Agent, Model
-from space import Point, euclidean, move
-from marker import Marker, MarkerPurpose
+from geometry import Point, euclidean, heading, move
+from marker import MarkerPurpose
+from collision import MAX_ITERATIONS, as_objects, choose_angle
 
 PROBA_CHGT_ANGLE = 0.3
 MAX_MARKERS = np.inf
-MAX_ITERATIONS = 100
 
 
 class Ant(Agent):
@@ -46,48 +45,34 @@ class Ant(Agent):
         return next_x, next_y
 
     def look_for_food(self):
-        if foods_at_sight := [
-            food
-            for food in self.model.foods
-            if euclidean(self, food) < self.sight_distance
-        ]:
-            nearest_food = foods_at_sight[
-                np.argmin([euclidean(self, food) for food in foods_at_sight])
-            ]
-
-            return nearest_food
+        nearest_food, _ = self.model.food_index().nearest_within(
+            self.x, self.y, self.sight_distance
+        )
+        if nearest_food >= 0:
+            return self.model.foods[nearest_food]
 
     def look_for_food_marker(self, back_to_colony=False):
-        if back_to_colony:
-            if food_markers_at_sight := [
-                marker
-                for marker in self.model.markers_dict[str(self.colony.id_colony)]
-                if marker.purpose == MarkerPurpose.FOOD
-                and np.array([self.x - self.colony.x, self.y - self.colony.y])
-                @ np.array([self.x - marker.x, self.y - marker.y])
-                > 0
-            ]:
-                nearest_food_marker = food_markers_at_sight[
-                    np.argmin(
-                        [euclidean(self, marker) for marker in food_markers_at_sight]
-                    )
-                ]
-
-                return nearest_food_marker
-
-        else:
-            if food_markers_at_sight := [
-                marker
-                for marker in self.model.markers_dict[str(self.colony.id_colony)]
-                if marker.purpose == MarkerPurpose.FOOD
-            ]:
-                nearest_food_marker = food_markers_at_sight[
-                    np.argmin(
-                        [euclidean(self, marker) for marker in food_markers_at_sight]
-                    )
-                ]
-
-                return nearest_food_marker
+        if self.model.pheromones is not None:
+            # Markers are a pheromone field, the ant senses it around itself
+            (x,), (y,) = self.model.pheromones.sense(
+                self.colony.id_colony,
+                MarkerPurpose.FOOD,
+                self.x,
+                self.y,
+                self.sight_distance,
+                towards=(self.colony.x, self.colony.y) if back_to_colony else None,
+            )
+            return None if np.isnan(x) else Point(x, y)
+
+        markers = self.model.markers_dict[str(self.colony.id_colony)]
+        nearest_food_marker = markers.nearest(
+            self.x,
+            self.y,
+            MarkerPurpose.FOOD,
+            towards=(self.colony.x, self.colony.y) if back_to_colony else None,
+        )
+        if nearest_food_marker >= 0:
+            return markers.get(nearest_food_marker)
 
     def go_to(self, destination) -> Tuple:
         dist_to_destination = euclidean(self, destination)
@@ -100,14 +85,14 @@ class Ant(Agent):
 
         if dist_to_destination < self.speed or entering:
             next_x, next_y = destination.x, destination.y
-            next_angle = np.pi * (random.random() * 2 - 1)
+            next_angle = np.pi * (self.model.rng.random() * 2 - 1)
             reached = True
             return next_x, next_y, next_angle, reached
 
         else:
-            next_angle = np.arccos((destination.x - self.x) / dist_to_destination)
-            if destination.y < self.y:
-                next_angle = -next_angle
+            next_angle = heading(
+                self.x, self.y, destination.x, destination.y, dist_to_destination
+            )
             return *self.next_pos(), next_angle, reached
 
     def go_back_to_colony(self) -> Tuple:
@@ -119,96 +104,34 @@ class Ant(Agent):
 
         return next_x, next_y, next_angle
 
-    def will_crash_with(self, object):
-        """
-        Check if the ant will crash with ``object``.
-        ``object`` is either an obstacle or another ant.
-        """
-        pf = Point(*move(self.x, self.y, self.speed, self.angle))
-        p0pf = np.array([pf.x - self.x, pf.y - self.y])
-        p0pc = np.array([object.x - self.x, object.y - self.y])
-        norm_p0pf = euclidean(self, pf)
-        norm_p0pc = euclidean(self, object)
-        prod = p0pf @ p0pc
-        norm_p0ph = abs(prod / norm_p0pf)
-        radius = object.speed if isinstance(object, Ant) else object.r
-
-        if norm_p0ph > norm_p0pf:
-            dist = euclidean(pf, object)
-        elif prod < 0:
-            dist = np.inf
-        #     dist = euclidean(p0, pc)
-        else:
-            dist = np.sqrt(norm_p0pc**2 - norm_p0ph**2)
-
-        return dist <= radius
+    def neighbors(self):
+        return [
+            ant
+            for ant in self.model.ants_grid.query(self.x, self.y, self.sight_distance)
+            if self != ant
+        ]
 
-    def will_crash(self, objects):
+    def avoid_crash(self, ants=None):
         """
-        Check if the ant will crash with an element of ``objects``
+        Angle avoiding the obstacles and, if given, ``ants``, all the
+        candidate angles being checked at once.
         """
-        for obj in objects:
-            if self.will_crash_with(obj):
-                return True
-        return False
+        return choose_angle(
+            self.x,
+            self.y,
+            self.speed,
+            self.angle,
+            self.model.rng,
+            obstacle_map=self.model.obstacle_map,
+            ants=None if ants is None else as_objects(ants, lambda a: a.speed),
+            space=self.model.space,
+            profiler=self.model.profiler,
+        )
 
     def step(self):
-        ants = [
-            ant
-            for ant in self.model.schedule.agents
-            if self != ant and euclidean(self, ant) < self.sight_distance
-        ]
-        obstacles = [
-            obstacle
-            for obstacle in self.model.obstacles
-            if euclidean(self, obstacle) < self.sight_distance
-        ]
-
-        crash = self.model.space.out_of_bounds(self.next_pos())
-        if not crash:
-            crash = self.will_crash(ants) or self.will_crash(obstacles)
-
-        iter = 0
-        initial_angle = self.angle
-        while crash and iter < MAX_ITERATIONS:
-            # ---- Priority X.X ----
-            # We try to avoid a crash with either any ant or any obstacle
-            if iter % 2:
-                self.angle = (
-                    initial_angle + (iter // 2 + 1) * random.random() * 2 * np.pi
-                )
-            else:
-                self.angle = (
-                    initial_angle - (iter // 2 + 1) * random.random() * 2 * np.pi
-                )
-
-            crash = self.model.space.out_of_bounds(self.next_pos())
-            if not crash:
-                crash = self.will_crash(ants) or self.will_crash(obstacles)
-            iter += 1
-
-        if crash:
-            # The ant couldn't avoid a crash with an obstacle or an ant
-            iter = 0
-            while crash and iter < MAX_ITERATIONS:
-                # ---- Priority X.X ----
-                # At least it
-                if iter % 2:
-                    self.angle = (
-                        initial_angle + (iter // 2 + 1) * random.random() * 2 * np.pi
-                    )
-                else:
-                    self.angle = (
-                        initial_angle - (iter // 2 + 1) * random.random() * 2 * np.pi
-                    )
-
-                crash = self.will_crash(obstacles)
-                iter += 1
-
-        if crash:
-            # The ant didn't succeed in finding a convenient angle, it maintain its initial trajectory
-
-            self.angle = initial_angle
+        # ---- Priority X.X ----
+        # We try to avoid a crash with either any ant or any obstacle
+        self.angle = self.avoid_crash(self.neighbors())
 
         next_x, next_y, next_angle = *self.next_pos(), self.angle
 
@@ -237,15 +160,13 @@ class Ant(Agent):
             next_x, next_y, next_angle = self.go_back_to_colony()
 
             if len(self.model.markers_dict[str(self.colony.id_colony)]) < MAX_MARKERS:
-                food_marker = Marker(
+                self.model.add_marker(
                     x=self.x,
                     y=self.y,
                     colony_id=self.colony.id_colony,
                     purpose=MarkerPurpose.FOOD,
                     direction=next_angle,
-                    color=self.colony.markers_colors[self.colony.id_colony][0],
                 )
-                self.model.markers_dict[str(self.colony.id_colony)].append(food_marker)
                 self.ignore_markers_counts += self.ignore_steps_after_marker
 
         else:
@@ -253,7 +174,7 @@ class Ant(Agent):
 
             if (
                 nearest_food := self.look_for_food()
-            ) is not None and random.random() < self.epsilon:
+            ) is not None and self.model.rng.random() < self.epsilon:
                 # The ant saw some food and eager
 
                 next_x, next_y, next_angle, food_reached = self.go_to(nearest_food)
@@ -263,16 +184,12 @@ class Ant(Agent):
                     len(self.model.markers_dict[str(self.colony.id_colony)])
                     < MAX_MARKERS
                 ):
-                    food_marker = Marker(
+                    self.model.add_marker(
                         x=self.x,
                         y=self.y,
                         colony_id=self.colony.id_colony,
                         purpose=MarkerPurpose.FOOD,
                         direction=next_angle,
-                        color=self.colony.markers_colors[self.colony.id_colony][0],
-                    )
-                    self.model.markers_dict[str(self.colony.id_colony)].append(
-                        food_marker
                     )
                     self.ignore_markers_counts += self.ignore_steps_after_marker
 
@@ -288,7 +205,7 @@ class Ant(Agent):
                 if (
                     self.ignore_markers_counts == 0
                     and (nearest_food_marker := self.look_for_food_marker()) is not None
-                    and random.random() < self.epsilon
+                    and self.model.rng.random() < self.epsilon
                 ):
                     # The ant is aware of markers and saw one
 
@@ -303,10 +220,11 @@ class Ant(Agent):
                     # The ant did not see any food nor markers, it explores the environement
 
                     next_x, next_y = self.next_pos()
-                    next_angle = np.pi * (random.random() * 2 - 1)
+                    next_angle = np.pi * (self.model.rng.random() * 2 - 1)
 
         # Update ant states
         self.x, self.y, self.angle = next_x, next_y, next_angle
+        self.model.ants_grid.move(self)
         self.ignore_markers_counts = max(0, self.ignore_markers_counts - 1)
 
     def portrayal_method(self):
@@ -361,57 +279,20 @@ class Warrior(Ant):
     def go_back_to_colony(self) -> Tuple:
         return super().go_back_to_colony()
 
-    def will_crash(self, objects):
-        return super().will_crash(objects)
-
     def look_for_ant(self):
-        if ants_at_sight := [
-            ant
-            for ant in self.model.schedule.agents
-            if isinstance(ant, (Ant, Warrior))
-            and ant.colony.id_colony != self.colony.id_colony
-            and euclidean(self, ant) < self.sight_distance
-        ]:
-            nearest_ant = ants_at_sight[
-                np.argmin([euclidean(self, ant) for ant in ants_at_sight])
-            ]
+        if ants_at_sight := list(
+            self.model.ants_grid.query(
+                self.x, self.y, self.sight_distance, exclude=self.colony.id_colony
+            )
+        ):
+            nearest_ant = min(ants_at_sight, key=lambda ant: euclidean(self, ant))
 
             return nearest_ant
 
     def step(self):
-        obstacles = [
-            obstacle
-            for obstacle in self.model.obstacles
-            if euclidean(self, obstacle) < self.sight_distance
-        ]
-
-        crash = self.model.space.out_of_bounds(self.next_pos())
-        if not crash:
-            crash = self.will_crash(obstacles)
-
-        iter = 0
-        initial_angle = self.angle
-        while crash and iter < MAX_ITERATIONS:
-            # ---- Priority X.X ----
-            # We try to avoid a crash with any obstacle
-            if iter % 2:
-                self.angle = (
-                    initial_angle + (iter // 2 + 1) * random.random() * 2 * np.pi
-                )
-            else:
-                self.angle = (
-                    initial_angle - (iter // 2 + 1) * random.random() * 2 * np.pi
-                )
-
-            crash = self.model.space.out_of_bounds(self.next_pos())
-            if not crash:
-                crash = self.will_crash(obstacles)
-            iter += 1
-
-        if crash:
-            # The ant didn't succeed in finding a convenient angle, it maintain its initial trajectory
-
-            self.angle = initial_angle
+        # ---- Priority X.X ----
+        # We try to avoid a crash with any obstacle
+        self.angle = self.avoid_crash()
 
         next_x, next_y, next_angle = *self.next_pos(), self.angle
 
@@ -423,45 +304,37 @@ class Warrior(Ant):
                     len(self.model.markers_dict[str(nearest_ant.colony.id_colony)])
                     < MAX_MARKERS
                 ):
-                    danger_marker = Marker(
+                    self.model.add_marker(
                         x=nearest_ant.x,
                         y=nearest_ant.y,
                         colony_id=nearest_ant.colony.id_colony,
                         purpose=MarkerPurpose.DANGER,
                         direction=nearest_ant.angle,
-                        color=nearest_ant.colony.markers_colors[
-                            nearest_ant.colony.id_colony
-                        ][1],
-                    )
-                    self.model.markers_dict[str(nearest_ant.colony.id_colony)].append(
-                        danger_marker
                     )
                     self.ignore_markers_counts += self.ignore_steps_after_marker
 
                 if not isinstance(nearest_ant, Warrior):
                     # If the warrior ant is near a basic ant it will just kill it while the ant will reduce its lifespan
-                    self.model.schedule.remove(nearest_ant)
-                    self.model.colonies[nearest_ant.colony.id_colony].ants.remove(
-                        nearest_ant
-                    )
+                    self.model.kill(nearest_ant)
                     self.lifespan -= 1  # It takes two ants to destroy a warrior
+                    if self.lifespan == 0:
+                        # The warrior stays on the ground until the end of the step
+                        self.model.schedule.kill(self)
 
                     # The warrior will go back to its colony to protect its fellow ants like a shield
                     self.go_back_to_colony()
                 else:
                     # Besides, if it is next to warrior which is an opponent, they destroy each other
-                    self.model.schedule.remove(nearest_ant)
-                    self.model.colonies[nearest_ant.colony.id_colony].warriors.remove(
-                        nearest_ant
-                    )
-                    self.model.schedule.remove(self)
-                    self.model.colonies[self.colony.id_colony].warriors.remove(self)
+                    self.model.kill(nearest_ant)
+                    self.model.kill(self)
 
         else:
             next_x, next_y = self.next_pos()
-            next_angle = np.pi * (random.random() * 2 - 1)
+            next_angle = np.pi * (self.model.rng.random() * 2 - 1)
 
         self.x, self.y, self.angle = next_x, next_y, next_angle
+        if self in self.model.ants_grid:
+            self.model.ants_grid.move(self)
 
     def portrayal_method(self):
         portrayal = {
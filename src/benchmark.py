@@ -0,0 +1,260 @@
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from ant import Warrior
+from canvas import ContinuousCanvas
+from environnement import Ground
+from marker import MarkerPurpose
+
+SEED = 0
+# Scenarios of Ground.step, every combination is timed
+GRID = {
+    "n_ants": (10, 40),
+    "n_warriors": (0, 10),
+    "n_obstacles": (5, 20),
+    "markers": (0, 5000),
+}
+BASE_PARAMS = {
+    "n_colonies": 2,
+    "n_foods": 3,
+    "color_food": "#EAEA08",
+    "epsilons": [0.5, 0.5],
+    "speed": 15,
+}
+THRESHOLD = 1.2  # Slowdown from which compare reports a regression
+
+
+def build(scenario, engine="agents", seed=SEED):
+    """
+    ``Ground`` of ``scenario``: the number of ants and warriors of each
+    colony, of obstacles and of markers added at random to each colony.
+    """
+    n_colonies = BASE_PARAMS["n_colonies"]
+    model = Ground(
+        **BASE_PARAMS,
+        n_ants=[scenario["n_ants"]] * n_colonies,
+        n_warriors=[scenario["n_warriors"]] * n_colonies,
+        n_obstacles=scenario["n_obstacles"],
+        engine=engine,
+        seed=seed,
+        collect="end",
+    )
+    rng = np.random.default_rng(seed)
+    for markers in model.markers_dict.values():
+        n = scenario["markers"]
+        markers.extend(
+            rng.random(n) * model.space.width,
+            rng.random(n) * model.space.height,
+            MarkerPurpose.FOOD,
+            rng.random(n) * 2 * np.pi,
+        )
+    return model
+
+
+def best_of(repeat, run):
+    """
+    Smallest duration of ``repeat`` calls to ``run``, divided by the number
+    of operations ``run`` returns.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n = run()
+        best = min(best, (time.perf_counter() - start) / max(n, 1))
+    return best
+
+
+def time_steps(scenario, engine="agents", steps=10, repeat=3):
+    """
+    Seconds per ``Ground.step`` of ``scenario``, the model being rebuilt
+    for every repetition so that they all time the same steps.
+    """
+
+    def run():
+        model = build(scenario, engine)
+        start = time.perf_counter()
+        for _ in range(steps):
+            model.step()
+        return time.perf_counter() - start
+
+    return min(run() for _ in range(repeat)) / steps
+
+
+def time_hotspots(scenario, repeat=3):
+    """
+    Seconds per call of the functions most of a step is spent in, called on
+    every agent of ``scenario`` (or on the model for the canvas).
+    """
+    model = build(scenario)
+    agents = list(model.schedule.agents)
+    ants = [a for a in agents if not isinstance(a, Warrior)]
+    warriors = [a for a in agents if isinstance(a, Warrior)]
+
+    def each(agents, method):
+        def run():
+            for agent in agents:
+                method(agent)
+            return len(agents)
+
+        return run
+
+    hotspots = {
+        "Ant.step": each(ants, lambda a: a.step()),
+        "Warrior.step": each(warriors, lambda a: a.step()),
+        "Ant.look_for_food_marker": each(ants, lambda a: a.look_for_food_marker()),
+        "Ant.avoid_crash": each(ants, lambda a: a.avoid_crash(a.neighbors())),
+    }
+    for name, canvas in (
+        ("ContinuousCanvas.render", ContinuousCanvas()),
+        ("ContinuousCanvas.render[delta]", ContinuousCanvas(delta=True)),
+        ("ContinuousCanvas.render[heatmap]", ContinuousCanvas(heatmap=True)),
+    ):
+        canvas.render(model)  # The first delta frame is a full one
+
+        def render(canvas=canvas):
+            canvas.render(model)
+            return 1
+
+        hotspots[name] = render
+    return {
+        name: best_of(repeat, run)
+        for name, run in hotspots.items()
+        if name != "Warrior.step" or warriors
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(grid=GRID, engines=("agents",), steps=10, repeat=3):
+    """
+    Results of the benchmarks as a JSON-able dict: one record per timing,
+    named after what is timed, with its scenario and its seconds per call.
+    """
+    names = list(grid.keys())
+    scenarios = [
+        dict(zip(names, values)) for values in itertools.product(*grid.values())
+    ]
+    results = []
+    for scenario in scenarios:
+        for engine in engines:
+            results.append(
+                {
+                    "name": "Ground.step",
+                    "params": dict(scenario, engine=engine),
+                    "seconds": time_steps(scenario, engine, steps, repeat),
+                }
+            )
+    # Hot spots only exist with agents, they are timed on the largest scenario
+    largest = {name: max(values) for name, values in grid.items()}
+    for name, seconds in time_hotspots(largest, repeat).items():
+        results.append({"name": name, "params": largest, "seconds": seconds})
+
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "steps": steps,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def key(result):
+    return result["name"], json.dumps(result["params"], sort_keys=True)
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    Ratio of the timings of ``current`` to the ones of ``baseline`` for the
+    benchmarks found in both, and those slower by more than ``threshold``.
+    """
+    before = {key(result): result["seconds"] for result in baseline["results"]}
+    ratios = []
+    for result in current["results"]:
+        if key(result) in before:
+            ratios.append((result, result["seconds"] / before[key(result)]))
+    regressions = [(result, ratio) for result, ratio in ratios if ratio > threshold]
+    return ratios, regressions
+
+
+def describe(result):
+    params = ", ".join(f"{name}={value}" for name, value in result["params"].items())
+    return f"{result['name']} ({params})"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time Ground.step over a grid of scenarios and its hot spots"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        type=str,
+        help="JSON file of the results (default: printed)",
+    )
+    parser.add_argument(
+        "-c",
+        "--compare",
+        default=None,
+        type=str,
+        help="JSON file of previous results, exits with 1 if a benchmark got slower",
+    )
+    parser.add_argument(
+        "-t",
+        "--threshold",
+        default=THRESHOLD,
+        type=float,
+        help=f"slowdown ratio reported as a regression (default: {THRESHOLD})",
+    )
+    parser.add_argument(
+        "-e",
+        "--engines",
+        default=["agents"],
+        nargs="+",
+        help="engines of Ground timed (default: agents)",
+    )
+    parser.add_argument(
+        "--steps", default=10, type=int, help="steps timed per scenario (default: 10)"
+    )
+    parser.add_argument(
+        "--repeat",
+        default=3,
+        type=int,
+        help="repetitions of each timing, the best one is kept (default: 3)",
+    )
+    args = parser.parse_args()
+
+    current = run_benchmarks(engines=args.engines, steps=args.steps, repeat=args.repeat)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        ratios, regressions = compare(current, baseline, args.threshold)
+        for result, ratio in ratios:
+            print(f"{ratio:6.2f}x  {describe(result)}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold}x")
+            sys.exit(1)
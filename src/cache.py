@@ -0,0 +1,99 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from pathlib import Path
+
+from environnement import Ground
+
+MAX_BYTES = 256 * 2**20  # Beyond, the least recently used results are evicted
+
+
+def code_version():
+    """
+    Hash of the sources of the model, so that results cached by another
+    version of the code are never reused.
+    """
+    digest = hashlib.sha256()
+    for source in sorted(Path(inspect.getfile(Ground)).parent.glob("*.py")):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+def to_json(value):
+    # Tuples are stored as lists and NumPy scalars as plain numbers
+    return json.dumps(value, sort_keys=True, default=lambda o: o.item())
+
+
+class ResultCache:
+    """
+    Results of runs of ``Ground`` stored in the directory ``path``, one JSON
+    file per run, keyed by a hash of the parameters of the model (defaults
+    included), its seed and the version of the code.
+
+    Reading a result marks it as used, and once the files take more than
+    ``max_bytes``, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.version = code_version()
+
+    def key(self, params, seed):
+        arguments = inspect.signature(Ground).bind(**dict(params, seed=seed))
+        arguments.apply_defaults()
+        text = to_json({"params": arguments.arguments, "version": self.version})
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def file(self, key):
+        return self.path / f"{key}.json"
+
+    def get(self, key):
+        """
+        Result cached under ``key``, or None.
+        """
+        file = self.file(key)
+        try:
+            result = json.loads(file.read_text())
+            now = time.time_ns()
+            os.utime(file, ns=(now, now))
+        except FileNotFoundError:
+            return None
+        return result
+
+    def put(self, key, result):
+        # Written then renamed, so that concurrent readers never see a partial file
+        file = self.file(key)
+        partial = file.with_suffix(f".{os.getpid()}.tmp")
+        partial.write_text(to_json(result))
+        os.replace(partial, file)
+        self.evict()
+
+    def entries(self):
+        """
+        Cached files with their size, from the least to the most recently used.
+        """
+        entries = []
+        for file in self.path.glob("*.json"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, file.name, file, stat.st_size))
+        return [(file, size) for _, _, file, size in sorted(entries)]
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size in entries)
+        for file, size in entries:
+            if total <= self.max_bytes:
+                break
+            file.unlink(missing_ok=True)
+            total -= size
+
+    def __len__(self):
+        return len(self.entries())
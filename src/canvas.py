@@ -1,17 +1,65 @@
+import base64
+import time
 from collections import defaultdict
-from mesa.visualization.ModularVisualization import VisualizationElement
+
+import numpy as np
+from mesa.visualization.ModularVisualization import (
+    ModularServer,
+    SocketHandler,
+    VisualizationElement,
+)
+
+from marker import MarkerPurpose
+
+HEATMAP_RESOLUTION = 5  # Side of a cell of the heatmaps
+HEATMAP_SATURATION = 5  # Markers (or pheromone intensity) of a cell drawn fully opaque
 
 
 class ContinuousCanvas(VisualizationElement):
+    """
+    Draw the space of a ``Ground``.
+
+    By default every object is sent on every tick. With ``delta``, obstacles
+    and colonies are only sent when a model starts, then each frame only
+    carries the ants which moved or died, the foods when one changed and
+    the markers created or expired since the previous frame. What was sent
+    is kept per browser client, set as ``client`` by ``CanvasServer``.
+    ``max_fps`` skips the frames coming too fast, ``marker_stride`` only
+    draws one marker out of ``marker_stride``.
+
+    With ``heatmap``, markers are not drawn one by one but as the density of
+    the markers of each colony and purpose over a grid of
+    ``heatmap_resolution`` cells (the cells of the field with pheromones),
+    so that the frames don't grow with the number of markers.
+    """
+
     local_includes = [
         "./js/simple_continuous_canvas.js",
     ]
 
-    def __init__(self, canvas_height=500, canvas_width=500, instantiate=True):
+    def __init__(
+        self,
+        canvas_height=500,
+        canvas_width=500,
+        instantiate=True,
+        delta=False,
+        max_fps=None,
+        marker_stride=1,
+        heatmap=False,
+        heatmap_resolution=HEATMAP_RESOLUTION,
+    ):
         VisualizationElement.__init__(self)
         self.canvas_height = canvas_height
         self.canvas_width = canvas_width
         self.identifier = "space-canvas"
+        self.delta = delta
+        self.max_fps = max_fps
+        self.marker_stride = marker_stride
+        self.heatmap = heatmap
+        self.heatmap_resolution = heatmap_resolution
+        # What each browser client was last sent, see render_delta
+        self.client = None
+        self.sent = {}
         if instantiate:
             new_element = "new Simple_Continuous_Module({}, {},'{}')".format(
                 self.canvas_width, self.canvas_height, self.identifier
@@ -21,63 +69,262 @@ class ContinuousCanvas(VisualizationElement):
     def portrayal_method(self, obj):
         return obj.portrayal_method()
 
-    def render(self, model):
-        representation = defaultdict(list)
+    def normalize(self, model, x, y):
+        """
+        Coordinates of ``(x, y)`` (scalars or arrays) in ``[0, 1)``.
+        """
+        space = model.space
+        return (x - space.x_min) / space.width, (y - space.y_min) / space.height
 
-        for obj in model.schedule.agents:
-            portrayal = self.portrayal_method(obj)
-            if portrayal:
-                portrayal["x"] = (obj.x - model.space.x_min) / (
-                    model.space.x_max - model.space.x_min
-                )
-                portrayal["y"] = (obj.y - model.space.y_min) / (
-                    model.space.y_max - model.space.y_min
+    def portrayal_at(self, model, obj):
+        portrayal = self.portrayal_method(obj)
+        portrayal["x"], portrayal["y"] = self.normalize(model, obj.x, obj.y)
+        return portrayal
+
+    def marker_rows(self, markers, start):
+        """
+        Rows of the live ``markers`` created from the marker ``start`` on
+        (markers being numbered from the first one of the store), keeping one
+        out of ``marker_stride``.
+        """
+        rows = np.arange(
+            max(start, markers.head + markers.offset), markers.tail + markers.offset
+        )
+        return rows[rows % self.marker_stride == 0] - markers.offset
+
+    def heatmaps(self, model):
+        """
+        One ``heatmap`` portrayal per colony and purpose: the opacities of
+        the cells, as base64 encoded bytes, row by row from ``y_min``.
+        """
+        space = model.space
+        if model.pheromones is not None:
+            grids = model.pheromones.values
+        else:
+            bins = [
+                np.arange(
+                    0, space.height + self.heatmap_resolution, self.heatmap_resolution
+                ),
+                np.arange(
+                    0, space.width + self.heatmap_resolution, self.heatmap_resolution
+                ),
+            ]
+            grids = np.zeros(
+                (
+                    len(model.colonies),
+                    len(MarkerPurpose),
+                    len(bins[0]) - 1,
+                    len(bins[1]) - 1,
                 )
-            representation[portrayal["Layer"]].append(portrayal)
+            )
+            for id_colony in range(len(model.colonies)):
+                markers = model.markers_dict[str(id_colony)]
+                for purpose in MarkerPurpose:
+                    mask = markers.live("purpose") == purpose.value
+                    grids[id_colony, purpose.value - 1] = np.histogram2d(
+                        markers.live("y")[mask] - space.y_min,
+                        markers.live("x")[mask] - space.x_min,
+                        bins=bins,
+                    )[0]
 
-        for obj in model.colonies:
-            portrayal = self.portrayal_method(obj)
-            if portrayal:
-                portrayal["x"] = (obj.x - model.space.x_min) / (
-                    model.space.x_max - model.space.x_min
+        portrayals = []
+        for id_colony in range(len(model.colonies)):
+            colors = model.markers_dict[str(id_colony)].colors
+            for purpose in MarkerPurpose:
+                grid = grids[id_colony, purpose.value - 1]
+                if not grid.any():
+                    continue
+                alpha = np.minimum(grid * (255 / HEATMAP_SATURATION), 255).astype(
+                    np.uint8
                 )
-                portrayal["y"] = (obj.y - model.space.y_min) / (
-                    model.space.y_max - model.space.y_min
+                portrayals.append(
+                    {
+                        "Shape": "heatmap",
+                        "Layer": 2,
+                        "Color": colors[purpose],
+                        "rows": grid.shape[0],
+                        "cols": grid.shape[1],
+                        "data": base64.b64encode(alpha.tobytes()).decode("ascii"),
+                    }
                 )
+        return portrayals
+
+    def render(self, model):
+        if self.delta:
+            return self.render_delta(model)
+
+        representation = defaultdict(list)
+
+        for obj in model.schedule.agents:
+            portrayal = self.portrayal_at(model, obj)
             representation[portrayal["Layer"]].append(portrayal)
 
-        for obj in model.foods:
-            portrayal = self.portrayal_method(obj)
-            if portrayal:
-                portrayal["x"] = (obj.x - model.space.x_min) / (
-                    model.space.x_max - model.space.x_min
-                )
-                portrayal["y"] = (obj.y - model.space.y_min) / (
-                    model.space.y_max - model.space.y_min
+        if model.engine is not None:
+            for portrayal in model.engine.portrayals():
+                portrayal["x"], portrayal["y"] = self.normalize(
+                    model, portrayal["x"], portrayal["y"]
                 )
+                representation[portrayal["Layer"]].append(portrayal)
+
+        for obj in model.colonies + model.foods:
+            portrayal = self.portrayal_at(model, obj)
             representation[portrayal["Layer"]].append(portrayal)
 
-        for id_colony in range(len(model.colonies)):
-            for obj in model.markers_dict[str(id_colony)]:
-                portrayal = self.portrayal_method(obj)
-                if portrayal:
-                    portrayal["x"] = (obj.x - model.space.x_min) / (
-                        model.space.x_max - model.space.x_min
-                    )
-                    portrayal["y"] = (obj.y - model.space.y_min) / (
-                        model.space.y_max - model.space.y_min
+        if self.heatmap:
+            representation[2].extend(self.heatmaps(model))
+        else:
+            for id_colony in range(len(model.colonies)):
+                markers = model.markers_dict[str(id_colony)]
+                rows = self.marker_rows(markers, 0)
+                xs, ys = self.normalize(model, markers.x[rows], markers.y[rows])
+                colors = {
+                    purpose.value: color for purpose, color in markers.colors.items()
+                }
+                for x, y, purpose in zip(
+                    xs.tolist(), ys.tolist(), markers.purpose[rows].tolist()
+                ):
+                    representation[2].append(
+                        {
+                            "Shape": "circle",
+                            "Filled": "true",
+                            "Layer": 2,
+                            "Color": colors[purpose],
+                            "r": 1,
+                            "x": x,
+                            "y": y,
+                        }
                     )
-                representation[portrayal["Layer"]].append(portrayal)
 
         for obj in model.obstacles:
-            portrayal = self.portrayal_method(obj)
-            if portrayal:
-                portrayal["x"] = (obj.x - model.space.x_min) / (
-                    model.space.x_max - model.space.x_min
-                )
-                portrayal["y"] = (obj.y - model.space.y_min) / (
-                    model.space.y_max - model.space.y_min
-                )
+            portrayal = self.portrayal_at(model, obj)
             representation[portrayal["Layer"]].append(portrayal)
 
         return representation
+
+    def forget(self, client):
+        self.sent.pop(client, None)
+
+    def render_delta(self, model):
+        """
+        Changes since the previous frame sent to the current client, applied
+        by ``Simple_Continuous_Module``. A new client or a new model (a reset)
+        starts over with a full frame.
+        """
+        if self.client not in self.sent:
+            self.sent[self.client] = Sent()
+        sent = self.sent[self.client]
+        now = time.monotonic()
+        full = model is not sent.model
+        if not full and self.max_fps and now - sent.last_frame < 1 / self.max_fps:
+            # The changes will be sent with the next frame
+            return {"skip": True}
+        sent.last_frame = now
+
+        frame = {"full": full, "markers": {}}
+        if full:
+            sent.model = model
+            sent.ants, sent.foods, sent.marker_ends = {}, None, {}
+            frame["static"] = [
+                self.portrayal_at(model, obj)
+                for obj in model.obstacles + model.colonies
+            ]
+            frame["palettes"] = {
+                id_colony: {
+                    purpose.value: color
+                    for purpose, color in model.markers_dict[
+                        str(id_colony)
+                    ].colors.items()
+                }
+                for id_colony in range(len(model.colonies))
+            }
+
+        ants = {
+            obj.unique_id: self.portrayal_at(model, obj)
+            for obj in model.schedule.agents
+        }
+        if model.engine is not None:
+            for portrayal in model.engine.portrayals():
+                portrayal["x"], portrayal["y"] = self.normalize(
+                    model, portrayal["x"], portrayal["y"]
+                )
+                ants[portrayal.pop("id")] = portrayal
+        frame["ants"] = {
+            uid: portrayal
+            for uid, portrayal in ants.items()
+            if sent.ants.get(uid) != portrayal
+        }
+        frame["removed"] = [uid for uid in sent.ants if uid not in ants]
+        sent.ants = ants
+
+        foods = [self.portrayal_at(model, obj) for obj in model.foods]
+        if foods != sent.foods:
+            frame["foods"] = sent.foods = foods
+
+        if self.heatmap:
+            frame["heatmaps"] = self.heatmaps(model)
+            return frame
+
+        for id_colony in range(len(model.colonies)):
+            markers = model.markers_dict[str(id_colony)]
+            rows = self.marker_rows(markers, sent.marker_ends.get(id_colony, 0))
+            xs, ys = self.normalize(model, markers.x[rows], markers.y[rows])
+            frame["markers"][id_colony] = {
+                "first": markers.head + markers.offset,
+                "ids": (rows + markers.offset).tolist(),
+                "x": xs.tolist(),
+                "y": ys.tolist(),
+                "purpose": markers.purpose[rows].tolist(),
+            }
+            sent.marker_ends[id_colony] = markers.tail + markers.offset
+
+        return frame
+
+
+class Sent:
+    """
+    What ``ContinuousCanvas.render_delta`` last sent to a client.
+    """
+
+    def __init__(self):
+        self.model = None
+        self.last_frame = None
+        self.ants = {}
+        self.foods = None
+        self.marker_ends = {}
+
+
+class CanvasSocketHandler(SocketHandler):
+    """
+    ``SocketHandler`` telling the canvases which client they render for.
+    """
+
+    def canvases(self):
+        return [
+            element
+            for element in self.application.visualization_elements
+            if isinstance(element, ContinuousCanvas)
+        ]
+
+    def on_message(self, message):
+        for canvas in self.canvases():
+            canvas.client = self
+        super().on_message(message)
+
+    def on_close(self):
+        for canvas in self.canvases():
+            canvas.forget(self)
+
+
+class CanvasServer(ModularServer):
+    """
+    ``ModularServer`` whose ``ContinuousCanvas`` send their deltas to each
+    browser tab separately, every tab sharing the model.
+    """
+
+    socket_handler = (r"/ws", CanvasSocketHandler)
+    handlers = [
+        ModularServer.page_handler,
+        socket_handler,
+        ModularServer.static_handler,
+        ModularServer.local_handler,
+    ]
@@ -0,0 +1,272 @@
+import json
+
+import numpy as np
+from mesa import Agent
+
+from ant import Ant, Warrior
+from environnement import HEIGHT, WIDTH, Colony, Food, Ground, Obstacle
+from kernel import KernelEngine
+from marker import MarkerStore
+from obstacle_map import ObstacleMap
+
+VERSION = 1
+
+# Attributes of Ant saved as columns, Warrior adding its lifespan
+ANT_COLUMNS = (
+    "x",
+    "y",
+    "speed",
+    "angle",
+    "sight_distance",
+    "proba_cgt_angle",
+    "is_carrying",
+    "is_on_food_marker",
+    "ignore_markers_counts",
+    "ignore_steps_after_marker",
+    "color",
+    "epsilon",
+)
+ENGINE_COLUMNS = (
+    "uid",
+    "x",
+    "y",
+    "angle",
+    "speed",
+    "sight",
+    "colony",
+    "epsilon",
+    "is_warrior",
+    "lifespan",
+    "is_carrying",
+    "ignore_markers_counts",
+    "alive",
+    "colors",
+)
+KERNEL_COLUMNS = ("is_on_food_marker",)  # Added by KernelEngine
+
+
+def engine_columns(engine):
+    if isinstance(engine, KernelEngine):
+        return ENGINE_COLUMNS + KERNEL_COLUMNS
+    return ENGINE_COLUMNS
+
+
+def to_json(value):
+    # NumPy scalars are stored as plain numbers
+    return json.dumps(value, default=lambda o: o.item())
+
+
+def save(model, path, compress=False):
+    """
+    Save the state of ``model`` to the ``.npz`` file ``path``: one array per
+    attribute of the agents, foods, obstacles, colonies and markers, and a
+    JSON header with the parameters of the model, its counters and the
+    state of its random generators.
+
+    Agents are saved in the order of the scheduler. With a ``ParquetSink``,
+    only the metrics not written to the file yet are saved.
+    """
+    arrays = {}
+    collector = model.datacollector
+    header = {
+        "version": VERSION,
+        "params": model.params,
+        "steps": model.schedule.steps,
+        "time": model.schedule.time,
+        "current_id": model.current_id,
+        "running": model.running,
+        "stop_reason": model.stop_reason,
+        "stopped_at": model.stopped_at,
+        "last_food_picked": model.last_food_picked,
+        "last_food_picked_change": model.last_food_picked_change,
+        "rng": model.rng.bit_generator.state,
+        "random": model.random.getstate(),
+        "color_colonies": model.color_colonies,
+        "marker_colors": model.marker_colors,
+        "collector": {
+            "last": collector.last,
+            "last_step": collector.last_step,
+            "closed": collector.closed,
+        },
+        "markers": {
+            id_colony: {"first": markers.head + markers.offset, "tick": markers.tick}
+            for id_colony, markers in model.markers_dict.items()
+        },
+    }
+
+    for name, objects, attributes in (
+        ("obstacles", model.obstacles, ("x", "y", "r")),
+        ("foods", model.foods, ("x", "y", "r", "stock")),
+        ("colonies", model.colonies, ("x", "y", "r", "food_picked", "epsilon")),
+    ):
+        for attribute in attributes:
+            arrays[f"{name}_{attribute}"] = np.array(
+                [getattr(obj, attribute) for obj in objects], dtype=float
+            )
+
+    agents = list(model.schedule.agents)
+    arrays["agents_uid"] = np.array([a.unique_id for a in agents], dtype=np.int64)
+    arrays["agents_colony"] = np.array(
+        [a.colony.id_colony for a in agents], dtype=np.int64
+    )
+    arrays["agents_is_warrior"] = np.array(
+        [isinstance(a, Warrior) for a in agents], dtype=bool
+    )
+    arrays["agents_lifespan"] = np.array(
+        [getattr(a, "lifespan", 0) for a in agents], dtype=np.int64
+    )
+    for attribute in ANT_COLUMNS:
+        arrays["agents_" + attribute] = np.array(
+            [getattr(a, attribute) for a in agents]
+        )
+
+    if model.engine is not None:
+        for attribute in engine_columns(model.engine):
+            column = getattr(model.engine, attribute)
+            arrays["engine_" + attribute] = (
+                column.astype(str) if column.dtype == object else column
+            )
+
+    for id_colony, markers in model.markers_dict.items():
+        for column in markers.columns():
+            arrays[f"markers{id_colony}_{column}"] = markers.live(column)
+
+    if model.pheromones is not None:
+        arrays["pheromones"] = model.pheromones.values
+
+    for name in collector.names():
+        arrays["metrics_" + name] = collector.sink.column(name)
+
+    arrays["header"] = np.array(to_json(header))
+    (np.savez_compressed if compress else np.savez)(path, **arrays)
+
+
+def load(path, metrics_path=None, trajectory_path=None):
+    """
+    ``Ground`` saved by ``save`` to ``path``, stepping exactly as the saved
+    model would have. With ``metrics_path``, the saved metrics and the next
+    ones are streamed to that Parquet file. With ``trajectory_path``, the
+    next states of the agents are recorded to that file.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = dict(data)
+    header = json.loads(str(arrays.pop("header")))
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported checkpoint version {header['version']}")
+
+    # The model is built empty, then filled with the saved state
+    params = dict(
+        header["params"], metrics_path=metrics_path, trajectory_path=trajectory_path
+    )
+    n_colonies = params["n_colonies"]
+    model = Ground(
+        **dict(
+            params,
+            n_ants=[0] * n_colonies,
+            n_warriors=[0] * n_colonies,
+            n_obstacles=0,
+            n_foods=0,
+            trajectory_path=None,
+        )
+    )
+    model.params = params
+    model.schedule.steps = header["steps"]
+    model.schedule.time = header["time"]
+    model.current_id = header["current_id"]
+    model.running = header["running"]
+    model.stop_reason = header["stop_reason"]
+    model.stopped_at = header["stopped_at"]
+    model.last_food_picked = header["last_food_picked"]
+    model.last_food_picked_change = header["last_food_picked_change"]
+    model.rng.bit_generator.state = header["rng"]
+    version, state, gauss = header["random"]
+    model.random.setstate((version, tuple(state), gauss))
+    model.color_colonies = header["color_colonies"]
+    model.marker_colors = header["marker_colors"]
+
+    model.obstacles = [
+        Obstacle(x, y, r)
+        for x, y, r in zip(
+            arrays["obstacles_x"], arrays["obstacles_y"], arrays["obstacles_r"]
+        )
+    ]
+    model.obstacle_map = ObstacleMap(model.obstacles, WIDTH, HEIGHT)
+
+    model.foods = []
+    for x, y, r, stock in zip(
+        arrays["foods_x"], arrays["foods_y"], arrays["foods_r"], arrays["foods_stock"]
+    ):
+        food = Food(x, y, int(stock), color_food=model.color_food)
+        food.r = r
+        model.foods.append(food)
+    model.foods_index = None
+
+    model.colonies = []
+    for id_colony in range(n_colonies):
+        colony = Colony(
+            arrays["colonies_x"][id_colony],
+            arrays["colonies_y"][id_colony],
+            arrays["colonies_r"][id_colony],
+            color_colony=model.color_colonies[id_colony],
+            id_colony=id_colony,
+            markers_colors=model.marker_colors,
+            epsilon=arrays["colonies_epsilon"][id_colony],
+        )
+        colony.food_picked = int(arrays["colonies_food_picked"][id_colony])
+        model.colonies.append(colony)
+
+    for i, uid in enumerate(arrays["agents_uid"].tolist()):
+        warrior = bool(arrays["agents_is_warrior"][i])
+        # Attributes are set directly rather than through the constructors
+        agent = Warrior.__new__(Warrior) if warrior else Ant.__new__(Ant)
+        Agent.__init__(agent, uid, model)
+        for attribute in ANT_COLUMNS:
+            setattr(agent, attribute, arrays["agents_" + attribute][i].item())
+        agent.colony = model.colonies[int(arrays["agents_colony"][i])]
+        if warrior:
+            agent.lifespan = int(arrays["agents_lifespan"][i])
+            agent.colony.warriors[uid] = agent
+        else:
+            agent.colony.ants[uid] = agent
+        model.schedule.add(agent)
+        model.ants_grid.add(agent)
+        if model.profiler is not None:
+            model.profiler.instrument(agent)
+
+    if model.engine is not None:
+        for attribute in engine_columns(model.engine):
+            column = arrays["engine_" + attribute]
+            setattr(
+                model.engine,
+                attribute,
+                column.astype(object) if attribute == "colors" else column,
+            )
+
+    for id_colony in model.markers_dict:
+        markers = MarkerStore(int(id_colony), model.marker_colors[int(id_colony)])
+        prefix = f"markers{id_colony}_"
+        n = len(arrays[prefix + "x"])
+        markers.reserve(n)
+        for column in markers.columns():
+            getattr(markers, column)[:n] = arrays[prefix + column]
+        markers.tail = n
+        markers.offset = header["markers"][id_colony]["first"]
+        markers.tick = header["markers"][id_colony]["tick"]
+        model.markers_dict[id_colony] = markers
+
+    if model.pheromones is not None:
+        model.pheromones.values[...] = arrays["pheromones"]
+
+    collector = model.datacollector
+    metrics = {name: arrays["metrics_" + name] for name in collector.names()}
+    for i in range(len(metrics["Step"])):
+        collector.sink.append(
+            {name: column[i].item() for name, column in metrics.items()}
+        )
+    collector.last = header["collector"]["last"]
+    collector.last_step = header["collector"]["last_step"]
+    collector.closed = header["collector"]["closed"]
+
+    if trajectory_path is not None:
+        model.record_trajectories(trajectory_path, params.get("trajectory_stride", 1))
+    return model
@@ -0,0 +1,129 @@
+import numpy as np
+
+from geometry import move_many
+
+MAX_ITERATIONS = 100
+
+
+def segment_distances(x0, y0, speed, angle, cx, cy):
+    """
+    Distance between the centers ``(cx, cy)`` and the move segments of
+    length ``speed`` starting at ``(x0, y0)``, the crash check of the
+    agents. Centers behind the start of a move are at ``inf``.
+    Arguments are broadcast against each other.
+    """
+    vx, vy = speed * np.cos(angle), speed * np.sin(angle)
+    wx, wy = cx - x0, cy - y0
+    prod = vx * wx + vy * wy
+    norm_v = np.sqrt(vx**2 + vy**2)
+    norm_h = np.abs(prod / norm_v)
+    dist = np.sqrt(np.maximum(wx**2 + wy**2 - norm_h**2, 0))
+    dist = np.where(prod < 0, np.inf, dist)
+    return np.where(norm_h > norm_v, np.hypot(x0 + vx - cx, y0 + vy - cy), dist)
+
+
+def candidate_angles(initial_angle, draws):
+    """
+    Angles tried one after the other by the retry loop of ``Ant.step``,
+    ``draws`` being its uniform random numbers.
+    """
+    iteration = np.arange(len(draws))
+    shift = (iteration // 2 + 1) * draws * 2 * np.pi
+    return np.where(iteration % 2, initial_angle + shift, initial_angle - shift)
+
+
+def crashes(x, y, speed, angles, objects, space=None, obstacle_map=None):
+    """
+    Check, for each angle of ``angles``, if a move from ``(x, y)`` crashes
+    into one of ``objects`` (``(xs, ys, radius)`` arrays), into an obstacle
+    of ``obstacle_map`` or leaves ``space``.
+    """
+    angles = np.asarray(angles, dtype=float)
+    crash = np.zeros(angles.shape, dtype=bool)
+    if space is not None:
+        next_x, next_y = move_many(x, y, speed, angles)
+        crash |= (
+            (next_x < space.x_min)
+            | (next_x >= space.x_max)
+            | (next_y < space.y_min)
+            | (next_y >= space.y_max)
+        )
+    xs, ys, radius = objects
+    if len(xs):
+        dist = segment_distances(x, y, speed, angles[:, None], xs[None], ys[None])
+        crash |= (dist <= radius[None]).any(axis=1)
+    if obstacle_map is not None:
+        crash |= obstacle_map.crashes(x, y, speed, angles)
+    return crash
+
+
+def as_objects(objects, radius):
+    """
+    ``(xs, ys, radius)`` arrays of ``objects``, ``radius`` giving the
+    radius of one object.
+    """
+    return (
+        np.array([o.x for o in objects], dtype=float),
+        np.array([o.y for o in objects], dtype=float),
+        np.array([radius(o) for o in objects], dtype=float),
+    )
+
+
+NO_OBJECTS = (np.empty(0), np.empty(0), np.empty(0))
+
+
+def merge(*objects):
+    return tuple(np.concatenate(arrays) for arrays in zip(*objects))
+
+
+def choose_angle(
+    x,
+    y,
+    speed,
+    initial_angle,
+    rng,
+    obstacles=NO_OBJECTS,
+    ants=None,
+    space=None,
+    obstacle_map=None,
+    profiler=None,
+):
+    """
+    Angle of an ant at ``(x, y)`` avoiding a crash, following ``Ant.step``.
+
+    The initial angle is kept if it is safe. Otherwise ``MAX_ITERATIONS``
+    random candidates are checked at once against the ``ants``, the
+    ``obstacles``, the ``obstacle_map`` and the borders of ``space``, and the
+    first safe one is picked. When ``ants`` are given and no candidate
+    avoids them, new candidates only need to avoid the obstacles. If every
+    candidate crashes, ``initial_angle`` is kept. The retries are counted
+    by ``profiler`` if given.
+    """
+    everything = obstacles if ants is None else merge(obstacles, ants)
+    if not crashes(x, y, speed, [initial_angle], everything, space, obstacle_map)[0]:
+        return initial_angle
+
+    angles = candidate_angles(initial_angle, rng.random(MAX_ITERATIONS))
+    safe = np.flatnonzero(
+        ~crashes(x, y, speed, angles, everything, space, obstacle_map)
+    )
+    if profiler is not None:
+        profiler.count(
+            "collision retries", int(safe[0]) + 1 if len(safe) else MAX_ITERATIONS
+        )
+    if len(safe):
+        return angles[safe[0]]
+
+    if ants is not None:
+        # The ant couldn't avoid a crash with an obstacle or an ant, at least it avoids obstacles
+        angles = candidate_angles(initial_angle, rng.random(MAX_ITERATIONS))
+        safe = np.flatnonzero(
+            ~crashes(x, y, speed, angles, obstacles, obstacle_map=obstacle_map)
+        )
+        if len(safe):
+            return angles[safe[0]]
+
+    # The ant didn't succeed in finding a convenient angle, it maintains its initial trajectory
+    if profiler is not None:
+        profiler.count("collision failures")
+    return initial_angle
@@ -0,0 +1,476 @@
+import numpy as np
+from marker import MarkerPurpose
+from collision import MAX_ITERATIONS, segment_distances
+from geometry import headings, move_many
+
+CHUNK_SIZE = 1 << 22  # Maximum number of pairwise distances held in memory at once
+CHUNK_AGENTS = 10000  # Agents whose collisions are solved together
+
+
+def pairs_within(qx, qy, px, py, radius):
+    """
+    Return the index pairs ``(i, j)`` such that query point ``i`` and point
+    ``j`` are strictly closer than ``radius``.
+
+    Points are sorted by the cell of a uniform grid of side ``radius`` and
+    each query only looks at the 3x3 cells around its own.
+    """
+    if len(qx) == 0 or len(px) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    x_min = min(qx.min(), px.min())
+    y_min = min(qy.min(), py.min())
+    pcx = ((px - x_min) // radius).astype(np.int64) + 1
+    pcy = ((py - y_min) // radius).astype(np.int64) + 1
+    qcx = ((qx - x_min) // radius).astype(np.int64) + 1
+    qcy = ((qy - y_min) // radius).astype(np.int64) + 1
+    n_rows = max(pcy.max(), qcy.max()) + 2
+
+    order = np.argsort(pcx * n_rows + pcy, kind="stable")
+    sorted_keys = (pcx * n_rows + pcy)[order]
+    query_keys = qcx * n_rows + qcy
+
+    qi, pj = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = query_keys + dx * n_rows + dy
+            start = np.searchsorted(sorted_keys, keys, "left")
+            counts = np.searchsorted(sorted_keys, keys, "right") - start
+            total = counts.sum()
+            if total == 0:
+                continue
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            qi.append(np.repeat(np.arange(len(qx)), counts))
+            pj.append(order[np.repeat(start, counts) + offsets])
+
+    if not qi:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    qi, pj = np.concatenate(qi), np.concatenate(pj)
+    close = (qx[qi] - px[pj]) ** 2 + (qy[qi] - py[pj]) ** 2 < radius**2
+    return qi[close], pj[close]
+
+
+class VectorizedEngine:
+    """
+    Struct-of-arrays simulation of the ants and warriors of a ``Ground``.
+
+    Every agent decides from the state of the previous tick (synchronous
+    update) following the rules of ``Ant.step`` and ``Warrior.step``, the
+    only sequential part being the resolution of warriors fights.
+    """
+
+    def __init__(self, model, spawns):
+        self.model = model
+        self.rng = model.rng
+        self.uid = np.array([s["unique_id"] for s in spawns], dtype=np.int64)
+        self.x = np.array([s["x"] for s in spawns], dtype=float)
+        self.y = np.array([s["y"] for s in spawns], dtype=float)
+        self.angle = np.array([s["angle"] for s in spawns], dtype=float)
+        self.speed = np.array([s["speed"] for s in spawns], dtype=float)
+        self.sight = np.array([s["sight_distance"] for s in spawns], dtype=float)
+        self.colony = np.array([s["colony"].id_colony for s in spawns], dtype=np.int64)
+        self.epsilon = np.array([s["epsilon"] for s in spawns], dtype=float)
+        self.is_warrior = np.array([s["warrior"] for s in spawns], dtype=bool)
+        self.lifespan = np.array([s["lifespan"] for s in spawns], dtype=np.int64)
+        self.is_carrying = np.zeros(len(spawns), dtype=bool)
+        self.ignore_markers_counts = np.zeros(len(spawns), dtype=np.int64)
+        self.ignore_steps_after_marker = 2
+        self.alive = np.ones(len(spawns), dtype=bool)
+        self.colors = np.array([s["color"] for s in spawns], dtype=object)
+
+    def count(self, id_colony, warriors=False):
+        return int(
+            np.count_nonzero(
+                self.alive & (self.colony == id_colony) & (self.is_warrior == warriors)
+            )
+        )
+
+    # ---- Movement ----
+
+    def out_of_bounds(self, x, y):
+        space = self.model.space
+        return (
+            (x < space.x_min)
+            | (x >= space.x_max)
+            | (y < space.y_min)
+            | (y >= space.y_max)
+        )
+
+    def crash_with_obstacles(self, idx, angle):
+        return self.model.obstacle_map.crashes(
+            self.x[idx], self.y[idx], self.speed[idx], angle
+        )
+
+    def crash_with_ants(self, idx, angle, qi, pj):
+        """
+        ``qi`` and ``pj`` are the pairs of ``neighbors`` restricted to ``idx``
+        (``qi`` indexes ``idx``).
+        """
+        crash = np.zeros(len(idx), dtype=bool)
+        if len(qi) == 0:
+            return crash
+        i = idx[qi]
+        dist = segment_distances(
+            self.x[i], self.y[i], self.speed[i], angle[qi], self.x[pj], self.y[pj]
+        )
+        crash[qi[dist <= self.speed[pj]]] = True
+        return crash
+
+    def neighbors(self, idx):
+        """
+        Ants which might be crashed into by the agents ``idx``: an ant
+        farther than both speeds added up cannot be reached in one move.
+        """
+        others = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        radius = self.speed[idx].max() + self.speed[others].max() + 1e-9
+        qi, pj = pairs_within(
+            self.x[idx], self.y[idx], self.x[others], self.y[others], radius
+        )
+        pj = others[pj]
+        i = idx[qi]
+        keep = (i != pj) & (
+            np.hypot(self.x[i] - self.x[pj], self.y[i] - self.y[pj]) < self.sight[i]
+        )
+        return qi[keep], pj[keep]
+
+    def surrounded(self, idx):
+        """
+        Agents of ``idx`` which crash into an ant whatever their angle.
+
+        An ant within its own speed of the agent forbids every angle of the
+        half-plane facing it, so every angle crashes when no gap between the
+        directions of those ants is wider than a half-turn.
+        """
+        alive = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return np.zeros(0, dtype=bool)
+        qi, pj = pairs_within(
+            self.x[idx],
+            self.y[idx],
+            self.x[alive],
+            self.y[alive],
+            self.speed[alive].max() + 1e-9,
+        )
+        pj = alive[pj]
+        i = idx[qi]
+        dx, dy = self.x[pj] - self.x[i], self.y[pj] - self.y[i]
+        dist = np.hypot(dx, dy)
+        keep = (i != pj) & (dist <= self.speed[pj]) & (dist < self.sight[i])
+        qi, alpha = qi[keep], np.arctan2(dy[keep], dx[keep])
+
+        order = np.lexsort((alpha, qi))
+        qi, alpha = qi[order], alpha[order]
+        counts = np.bincount(qi, minlength=len(idx))
+        first = np.cumsum(counts) - counts
+        has_any = counts > 0
+        max_gap = np.full(len(idx), 2 * np.pi)
+        last = first + counts - 1
+        max_gap[has_any] = alpha[first[has_any]] + 2 * np.pi - alpha[last[has_any]]
+        gaps = np.diff(alpha)
+        same_group = qi[1:] == qi[:-1]
+        np.maximum.at(max_gap, qi[1:][same_group], gaps[same_group])
+        return has_any & (max_gap <= np.pi)
+
+    def candidate_angles(self, initial_angle, iteration, n):
+        # Iteration ``iteration`` of the retry loop of ``Ant.step`` for ``n`` agents at once
+        shift = (iteration // 2 + 1) * self.rng.random(n) * 2 * np.pi
+        return initial_angle + shift if iteration % 2 else initial_angle - shift
+
+    def avoid_crashes(self, idx):
+        """
+        Pick the angle of the agents ``idx`` the way ``Ant.step`` and
+        ``Warrior.step`` retry random angles.
+        """
+        initial_angle = self.angle[idx].copy()
+        angle = initial_angle.copy()
+        foragers = ~self.is_warrior[idx]
+        surrounded = np.zeros(len(idx), dtype=bool)
+        surrounded[foragers] = self.surrounded(idx[foragers])
+
+        free = np.flatnonzero(foragers & ~surrounded)
+        qi, pj = self.neighbors(idx[free])
+        qi = free[qi]
+
+        def crash_of(sub, with_ants, with_bounds):
+            crash = np.zeros(len(sub), dtype=bool)
+            if with_bounds:
+                crash |= self.out_of_bounds(
+                    *move_many(
+                        self.x[idx[sub]],
+                        self.y[idx[sub]],
+                        self.speed[idx[sub]],
+                        angle[sub],
+                    )
+                )
+            crash |= self.crash_with_obstacles(idx[sub], angle[sub])
+            if with_ants:
+                position = np.full(len(idx), -1)
+                position[sub] = np.arange(len(sub))
+                pairs = position[qi] >= 0
+                crash |= self.crash_with_ants(
+                    idx[sub], angle[sub], position[qi[pairs]], pj[pairs]
+                )
+                crash |= surrounded[sub]
+            return crash
+
+        crash = crash_of(np.arange(len(idx)), True, True)
+        for iteration in range(MAX_ITERATIONS):
+            # Surrounded ants would only draw crashing angles
+            sub = np.flatnonzero(crash & ~surrounded)
+            if len(sub) == 0:
+                break
+            angle[sub] = self.candidate_angles(initial_angle[sub], iteration, len(sub))
+            crash[sub] = crash_of(sub, True, True)
+
+        # The ant couldn't avoid a crash with an obstacle or an ant, at least it avoids obstacles
+        retry = crash & foragers
+        for iteration in range(MAX_ITERATIONS):
+            sub = np.flatnonzero(retry)
+            if len(sub) == 0:
+                break
+            angle[sub] = self.candidate_angles(initial_angle[sub], iteration, len(sub))
+            retry[sub] = crash_of(sub, False, False)
+        crash = np.where(foragers, retry, crash)
+
+        # The agent didn't succeed in finding a convenient angle, it maintains its initial trajectory
+        return np.where(crash, initial_angle, angle)
+
+    def go_to(self, idx, tx, ty, tr):
+        """
+        Vectorized ``Ant.go_to``, ``tr`` is the radius of the destinations
+        (0 for markers and ants).
+        """
+        dist = np.hypot(tx - self.x[idx], ty - self.y[idx])
+        reached = (dist < self.speed[idx]) | (dist < tr)
+        heading = headings(self.x[idx], self.y[idx], tx, ty, dist)
+        forward_x, forward_y = move_many(
+            self.x[idx], self.y[idx], self.speed[idx], self.angle[idx]
+        )
+        next_x = np.where(reached, tx, forward_x)
+        next_y = np.where(reached, ty, forward_y)
+        next_angle = np.where(
+            reached, np.pi * (self.rng.random(len(idx)) * 2 - 1), heading
+        )
+        return next_x, next_y, next_angle, reached
+
+    # ---- Targets ----
+
+    def drop_food_markers(self, idx, direction):
+        self.add_food_markers(idx, direction)
+        self.ignore_markers_counts[idx] += self.ignore_steps_after_marker
+
+    def add_food_markers(self, idx, direction):
+        if self.model.pheromones is not None:
+            self.model.pheromones.deposit(
+                self.colony[idx], MarkerPurpose.FOOD, self.x[idx], self.y[idx]
+            )
+        else:
+            for id_colony in np.unique(self.colony[idx]):
+                members = self.colony[idx] == id_colony
+                self.model.markers_dict[str(id_colony)].extend(
+                    self.x[idx[members]],
+                    self.y[idx[members]],
+                    MarkerPurpose.FOOD,
+                    direction[members],
+                )
+
+    def pick_food(self, ants, targets):
+        """
+        The ``ants`` reached the foods of index ``targets``, each takes a piece
+        while the stock lasts, in the order of ``ants``.
+        """
+        foods = self.model.foods
+        order = np.argsort(targets, kind="stable")
+        first = np.searchsorted(targets[order], targets[order])
+        stock = np.array([foods[f].stock for f in targets[order]], dtype=np.int64)
+        served = np.sort(order[np.arange(len(order)) - first < stock])
+        for f in targets[served]:
+            foods[f].get_one_piece()
+        self.is_carrying[ants[served]] = True
+
+    # ---- Step ----
+
+    def step_foragers(self, idx, next_x, next_y, next_angle):
+        model = self.model
+        colonies = model.colonies
+
+        # The ant is carrying food, it wants to go back to the colony
+        carrying = idx[self.is_carrying[idx]]
+        cx = np.array([colonies[c].x for c in self.colony[carrying]])
+        cy = np.array([colonies[c].y for c in self.colony[carrying]])
+        cr = np.array([colonies[c].r for c in self.colony[carrying]])
+        nx, ny, na, reached = self.go_to(carrying, cx, cy, cr)
+        next_x[carrying], next_y[carrying], next_angle[carrying] = nx, ny, na
+        for c in self.colony[carrying[reached]]:
+            colonies[c].food_picked += 1
+        self.is_carrying[carrying[reached]] = False
+        self.drop_food_markers(carrying, na)
+
+        # The ant is looking for either food or markers
+        looking = idx[~self.is_carrying[idx]]
+        looking = looking[~np.isin(looking, carrying)]
+        foods = model.foods
+        fx = np.array([f.x for f in foods])
+        fy = np.array([f.y for f in foods])
+        nearest_food, _ = model.food_index().nearest_many(
+            self.x[looking], self.y[looking], self.sight[looking]
+        )
+        eager = (nearest_food >= 0) & (
+            self.rng.random(len(looking)) < self.epsilon[looking]
+        )
+
+        # The ant saw some food and is eager
+        to_food = looking[eager]
+        targets = nearest_food[eager]
+        fr = np.array([f.r for f in foods])[targets] if foods else np.empty(0)
+        nx, ny, na, reached = self.go_to(to_food, fx[targets], fy[targets], fr)
+        next_x[to_food], next_y[to_food], next_angle[to_food] = nx, ny, na
+        self.drop_food_markers(to_food, na)
+        self.pick_food(to_food[reached], targets[reached])
+
+        # The ant did not see any food, it follows its colony markers or explores
+        others = looking[~eager]
+        aware = others[self.ignore_markers_counts[others] == 0]
+        exploring = [others[self.ignore_markers_counts[others] > 0]]
+        for id_colony in range(len(colonies)):
+            members = aware[self.colony[aware] == id_colony]
+            if model.pheromones is not None:
+                # The markers are sensed around the ant in the pheromone field
+                mx, my = model.pheromones.sense(
+                    id_colony,
+                    MarkerPurpose.FOOD,
+                    self.x[members],
+                    self.y[members],
+                    self.sight[members],
+                )
+            else:
+                _, mx, my = model.markers_dict[str(id_colony)].nearest_many(
+                    self.x[members], self.y[members], MarkerPurpose.FOOD
+                )
+            nearest_marker = np.where(np.isnan(mx), -1, np.arange(len(members)))
+            follow = (nearest_marker >= 0) & (
+                self.rng.random(len(members)) < self.epsilon[members]
+            )
+            followers = members[follow]
+            targets = nearest_marker[follow]
+            nx, ny, na, _ = self.go_to(
+                followers, mx[targets], my[targets], np.zeros(len(followers))
+            )
+            next_x[followers], next_y[followers], next_angle[followers] = nx, ny, na
+            exploring.append(members[~follow])
+
+        exploring = np.concatenate(exploring)
+        next_angle[exploring] = np.pi * (self.rng.random(len(exploring)) * 2 - 1)
+
+    def step_warriors(self, idx, next_x, next_y, next_angle):
+        self.fight(*self.hunt(idx, next_x, next_y, next_angle))
+
+    def hunt(self, idx, next_x, next_y, next_angle):
+        """
+        Move the warriors ``idx`` towards their nearest enemy, or at random.
+        Return the warriors which saw an enemy, their prey and whether they
+        reached it.
+        """
+        alive = np.flatnonzero(self.alive)
+        qi, pj = pairs_within(
+            self.x[idx], self.y[idx], self.x[alive], self.y[alive], self.sight.max()
+        )
+        pj = alive[pj]
+        i = idx[qi]
+        dist = np.hypot(self.x[i] - self.x[pj], self.y[i] - self.y[pj])
+        enemy = (self.colony[i] != self.colony[pj]) & (dist < self.sight[i])
+        qi, pj, dist = qi[enemy], pj[enemy], dist[enemy]
+
+        # Nearest enemy of each warrior: sort the pairs by distance and keep the first one
+        order = np.lexsort((dist, qi))
+        qi, pj = qi[order], pj[order]
+        first = np.ones(len(qi), dtype=bool)
+        first[1:] = qi[1:] != qi[:-1]
+        hunters, preys = idx[qi[first]], pj[first]
+
+        nx, ny, na, reached = self.go_to(
+            hunters, self.x[preys], self.y[preys], np.zeros(len(hunters))
+        )
+        next_x[hunters], next_y[hunters], next_angle[hunters] = nx, ny, na
+
+        explorers = idx[~np.isin(idx, hunters)]
+        next_angle[explorers] = np.pi * (self.rng.random(len(explorers)) * 2 - 1)
+        return hunters, preys, reached
+
+    def fight(self, hunters, preys, reached):
+        model = self.model
+        # Fights are resolved one at a time, in random order
+        fights = self.rng.permutation(np.flatnonzero(reached))
+        for k in fights:
+            warrior, prey = hunters[k], preys[k]
+            if not (self.alive[warrior] and self.alive[prey]):
+                continue
+            prey_colony = model.colonies[self.colony[prey]]
+            model.add_marker(
+                x=self.x[prey],
+                y=self.y[prey],
+                colony_id=prey_colony.id_colony,
+                purpose=MarkerPurpose.DANGER,
+                direction=self.angle[prey],
+            )
+            self.ignore_markers_counts[warrior] += self.ignore_steps_after_marker
+
+            if not self.is_warrior[prey]:
+                # The warrior kills the ant and loses some lifespan
+                self.alive[prey] = False
+                self.lifespan[warrior] -= 1
+
+                # Like Warrior.step, going back to the colony counts as a drop if the colony is reached
+                colony = model.colonies[self.colony[warrior]]
+                _, _, _, at_colony = self.go_to(
+                    np.array([warrior]),
+                    np.array([colony.x]),
+                    np.array([colony.y]),
+                    np.array([colony.r]),
+                )
+                if at_colony[0]:
+                    colony.food_picked += 1
+            else:
+                # Two warriors of opposing colonies destroy each other
+                self.alive[prey] = False
+                self.alive[warrior] = False
+
+    def step(self):
+        idx = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return
+        for chunk in np.array_split(idx, -(-len(idx) // CHUNK_AGENTS)):
+            self.angle[chunk] = self.avoid_crashes(chunk)
+
+        next_x, next_y = move_many(self.x, self.y, self.speed, self.angle)
+        next_angle = self.angle.copy()
+
+        self.step_foragers(idx[~self.is_warrior[idx]], next_x, next_y, next_angle)
+        self.step_warriors(idx[self.is_warrior[idx]], next_x, next_y, next_angle)
+
+        # Update ant states
+        self.x[idx], self.y[idx], self.angle[idx] = (
+            next_x[idx],
+            next_y[idx],
+            next_angle[idx],
+        )
+        foragers = idx[~self.is_warrior[idx]]
+        self.ignore_markers_counts[foragers] = np.maximum(
+            0, self.ignore_markers_counts[foragers] - 1
+        )
+        self.alive &= ~(self.is_warrior & (self.lifespan == 0))
+
+    def portrayals(self):
+        for i in np.flatnonzero(self.alive):
+            yield {
+                "id": int(self.uid[i]),
+                "Shape": "circle",
+                "Filled": "true",
+                "Color": self.colors[i],
+                "Layer": 3,
+                "r": 5 if self.is_warrior[i] else 3,
+                "x": self.x[i],
+                "y": self.y[i],
+            }
@@ -1,12 +1,26 @@
-import uuid
+import math
 import random
+import time
+from functools import partial
+
 import numpy as np
 from mesa import Model
 from mesa.space import ContinuousSpace
-from mesa.time import RandomActivation
-from mesa.datacollection import DataCollector
 
 from ant import Ant, Warrior
+from engine import VectorizedEngine
+from geometry import distance
+from kernel import KernelEngine
+from grid import PartitionedGrid
+from marker import MarkerPurpose, MarkerStore
+from metrics import Collector, ParquetSink
+from nearest import NearestIndex
+from obstacle_map import ObstacleMap
+from parallel import ParallelEngine
+from pheromone import PheromoneField
+from profiler import Profiler
+from scheduler import DeferredRandomActivation, StagedRandomActivation
+from trajectory import TrajectoryRecorder
 
 RADIUS_COLONY = 3
 MIN_STOCK = 10
@@ -16,6 +30,27 @@ HEIGHT = 500
 SIGHT_DISTANCE_A = 80  # Ant sight
 SIGHT_DISTANCE_W = 40  # Warrior sight
 LIFESPAN = 2  # Warrior's lifespan
+ENGINES = ("agents", "vectorized", "kernel", "parallel")
+MARKERS = ("objects", "field")
+STAGES = ("foragers", "warriors")  # Kinds of agents activated by stages
+
+# Reasons for a run to stop
+STOP_NO_FOOD = "no food left"
+STOP_ONE_COLONY_LEFT = "one colony left"
+STOP_STALLED = "stalled"
+STOP_MAX_STEPS = "max steps"
+
+
+def random_color(rng):
+    return "#" + "".join(rng.choice(list("0123456789ABCDEF"), 6))
+
+
+def stage_of(agent):
+    return "warriors" if isinstance(agent, Warrior) else "foragers"
+
+
+def colony_of(agent):
+    return agent.colony.id_colony
 
 
 class Obstacle:
@@ -62,8 +97,9 @@ class Colony:
         self.x = x
         self.y = y
         self.r = r
-        self.ants = []
-        self.warriors = []
+        # Living ants and warriors by unique_id
+        self.ants = {}
+        self.warriors = {}
         self.food_picked = 0
         self.color_colony = color_colony
         self.id_colony = id_colony
@@ -94,68 +130,122 @@ class Ground(Model):
         speed,
         allow_info_markers=True,
         allow_danger_markers=True,
+        engine="agents",
+        markers="objects",
+        seed=None,
+        max_steps=None,
+        stall_steps=None,
+        stop_when_one_colony_left=False,
+        collect="every",
+        collect_every=1,
+        metrics_path=None,
+        profile=False,
+        stages=None,
+        workers=None,
+        trajectory_path=None,
+        trajectory_stride=1,
     ):
+        # Arguments of the model, saved by checkpoints
+        self.params = {
+            name: value for name, value in locals().items() if name != "self"
+        }
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+        if markers not in MARKERS:
+            raise ValueError(f"markers must be one of {MARKERS}, got {markers!r}")
+        if stages is not None and sorted(stages) != sorted(STAGES):
+            raise ValueError(f"stages must order {STAGES}, got {stages!r}")
+        if engine == "kernel" and markers != "objects":
+            raise ValueError(
+                "the kernel engine only supports markers stored as objects"
+            )
+        if trajectory_stride < 1:
+            raise ValueError(
+                f"trajectory_stride must be at least 1, got {trajectory_stride!r}"
+            )
         Model.__init__(self)
+        # Every random draw of the model goes through these generators, seeded by ``seed``
+        self.rng = np.random.default_rng(seed)
+        self.random = random.Random(seed)
         self.space = ContinuousSpace(WIDTH, HEIGHT, False)
-        self.schedule = RandomActivation(self)
+        # With stages, all the foragers are activated before all the warriors (or the
+        # other way around), the environment being updated by Ground.step after both
+        self.schedule = (
+            DeferredRandomActivation(self)
+            if stages is None
+            else StagedRandomActivation(self, stages, stage_of, colony_of)
+        )
+
+        # Stopping criteria besides the end of the foods, see Ground.stop_reason_of_step
+        self.max_steps = max_steps
+        self.stall_steps = stall_steps
+        self.stop_when_one_colony_left = stop_when_one_colony_left
+        self.stop_reason = None
+        self.stopped_at = None
+        self.last_food_picked = 0
+        self.last_food_picked_change = 0
+        # With profile, the phases of the steps are timed, see Profiler
+        self.profiler = Profiler() if profile else None
 
         # These following parameters will serve as getters for class Ant which represents the agents of our simulation
         self.obstacles = []
         self.colonies = []
         self.foods = []
         self.color_food = color_food
-        self.markers_dict = {str(id): [] for id in range(n_colonies)}
-        
+        # With markers="field", markers are deposited in a pheromone field instead of markers_dict
+        self.pheromones = (
+            PheromoneField(WIDTH, HEIGHT, n_colonies) if markers == "field" else None
+        )
+
+        # Neighbor indexes, bucketed by the largest sight distance so that a sight query only visits 3x3 cells,
+        # one grid per colony so that warriors only look among their enemies
+        self.ants_grid = PartitionedGrid(SIGHT_DISTANCE_A, colony_of)
+        # KD-tree over self.foods, rebuilt when a food is removed
+        self.foods_index = None
+
+        # With the vectorized and kernel engines, ants and warriors only exist as rows of the engine arrays
+        self.engine = None
+        spawns = []
+
         self.color_colonies = []
         self.marker_colors = []
         for _ in range(n_colonies):
-            self.color_colonies.append("#"+''.join(random.choices('0123456789ABCDEF', k=6)))
-            self.marker_colors.append(["#"+''.join(random.choices('0123456789ABCDEF', k=6)),
-                              "#"+''.join(random.choices('0123456789ABCDEF', k=6))]) # element 0 for purpose FOOD and element 1 for DANGER
+            self.color_colonies.append(random_color(self.rng))
+            # Element 0 for purpose FOOD and element 1 for DANGER
+            self.marker_colors.append([random_color(self.rng), random_color(self.rng)])
+        self.markers_dict = {
+            str(id): MarkerStore(id, self.marker_colors[id]) for id in range(n_colonies)
+        }
 
         for _ in range(n_obstacles):
             self.obstacles.append(
                 Obstacle(
-                    random.random() * WIDTH,
-                    random.random() * HEIGHT,
-                    10 + 20 * random.random(),
+                    self.rng.random() * WIDTH,
+                    self.rng.random() * HEIGHT,
+                    10 + 20 * self.rng.random(),
                 )
             )
+        # Obstacles never move: collisions and placements only look up their distance map
+        self.obstacle_map = ObstacleMap(self.obstacles, WIDTH, HEIGHT)
 
         for _ in range(n_foods):
-            x, y = random.random() * WIDTH, random.random() * HEIGHT
-            stock = random.randint(MIN_STOCK, MAX_STOCK)
-            while [
-                o
-                for o in self.obstacles
-                if np.linalg.norm((o.x - x, o.y - y)) <= o.r + stock
-            ]:
-                x, y = random.random() * WIDTH, random.random() * HEIGHT
-                stock = random.randint(MIN_STOCK, MAX_STOCK)
+            x, y = self.rng.random() * WIDTH, self.rng.random() * HEIGHT
+            stock = int(self.rng.integers(MIN_STOCK, MAX_STOCK + 1))
+            while self.obstacle_map.distance(x, y) <= stock:
+                x, y = self.rng.random() * WIDTH, self.rng.random() * HEIGHT
+                stock = int(self.rng.integers(MIN_STOCK, MAX_STOCK + 1))
             food = Food(x, y, stock, color_food=self.color_food)
             self.foods.append(food)
 
         for id_colony in range(n_colonies):
-            x, y = random.random() * WIDTH, random.random() * HEIGHT
+            x, y = self.rng.random() * WIDTH, self.rng.random() * HEIGHT
             r = RADIUS_COLONY * n_ants[id_colony]
             while (
-                [
-                    o
-                    for o in self.obstacles
-                    if np.linalg.norm((o.x - x, o.y - y)) <= o.r + r
-                ]
-                or [
-                    f
-                    for f in self.foods
-                    if np.linalg.norm((f.x - x, f.y - y)) <= f.stock + r
-                ]
-                or [
-                    c
-                    for c in self.colonies
-                    if np.linalg.norm((c.x - x, c.y - y)) <= c.r + r
-                ]
+                self.obstacle_map.distance(x, y) <= r
+                or [f for f in self.foods if distance(x, y, f.x, f.y) <= f.stock + r]
+                or [c for c in self.colonies if distance(x, y, c.x, c.y) <= c.r + r]
             ):
-                x, y = random.random() * WIDTH, random.random() * HEIGHT
+                x, y = self.rng.random() * WIDTH, self.rng.random() * HEIGHT
             colony = Colony(
                 x,
                 y,
@@ -167,39 +257,55 @@ class Ground(Model):
             )
 
             for _ in range(n_ants[id_colony]):
-                ant = Ant(
-                    unique_id=int(uuid.uuid1()),
-                    model=self,
-                    x=x + np.cos(random.random() * 2 * np.pi) * colony.r,
-                    y=y + np.sin(random.random() * 2 * np.pi) * colony.r,
+                params = dict(
+                    unique_id=self.next_id(),
+                    x=x + math.cos(self.rng.random() * 2 * np.pi) * colony.r,
+                    y=y + math.sin(self.rng.random() * 2 * np.pi) * colony.r,
                     speed=speed,
                     colony=colony,
-                    angle=(random.random() * 2 - 1) * np.pi,
+                    angle=(self.rng.random() * 2 - 1) * np.pi,
                     sight_distance=SIGHT_DISTANCE_A,
                     color=colony.color_colony,
                     epsilon=colony.epsilon,
                 )
+                if engine != "agents":
+                    spawns.append(dict(params, warrior=False, lifespan=0))
+                    continue
+                ant = Ant(model=self, **params)
                 self.schedule.add(ant)
-                colony.ants.append(ant)
+                self.ants_grid.add(ant)
+                colony.ants[ant.unique_id] = ant
 
             for _ in range(n_warriors[id_colony]):
-                warrior = Warrior(
-                    unique_id=int(uuid.uuid1()),
-                    model=self,
-                    x=x + np.cos(random.random() * 2 * np.pi) * colony.r,
-                    y=y + np.sin(random.random() * 2 * np.pi) * colony.r,
+                params = dict(
+                    unique_id=self.next_id(),
+                    x=x + math.cos(self.rng.random() * 2 * np.pi) * colony.r,
+                    y=y + math.sin(self.rng.random() * 2 * np.pi) * colony.r,
                     speed=speed,
                     colony=colony,
-                    angle=(random.random() * 2 - 1) * np.pi,
+                    angle=(self.rng.random() * 2 - 1) * np.pi,
                     sight_distance=SIGHT_DISTANCE_W,
                     color=self.color_colonies[id_colony],
                     lifespan=LIFESPAN,
                 )
+                if engine != "agents":
+                    spawns.append(dict(params, warrior=True, epsilon=0))
+                    continue
+                warrior = Warrior(model=self, **params)
                 self.schedule.add(warrior)
-                colony.warriors.append(warrior)
+                self.ants_grid.add(warrior)
+                colony.warriors[warrior.unique_id] = warrior
 
             self.colonies.append(colony)
 
+        if engine == "vectorized":
+            self.engine = VectorizedEngine(self, spawns)
+        elif engine == "kernel":
+            self.engine = KernelEngine(self, spawns)
+        elif engine == "parallel":
+            # Vectorized engine stepped by ``workers`` processes (one per core by default)
+            self.engine = ParallelEngine(self, spawns, workers)
+
         model_reporters = {}
 
         #     "Danger markers 0": lambda model: len(
@@ -210,38 +316,175 @@ class Ground(Model):
         #     ),
         # },
 
-        for _ in range(n_colonies):
-            model_reporters["Food picked " + str(_)] = eval(
-                "lambda model: model.colonies[" + str(_) + "].food_picked"
+        for id_colony in range(n_colonies):
+            model_reporters["Food picked " + str(id_colony)] = partial(
+                Ground.food_picked, id_colony=id_colony
             )
-            model_reporters["Ants " + str(_)] = eval(
-                "lambda model: len(model.colonies[" + str(_) + "].ants)"
+            model_reporters["Ants " + str(id_colony)] = partial(
+                Ground.count_ants, id_colony=id_colony
             )
+            model_reporters["Markers " + str(id_colony)] = partial(
+                Ground.count_markers, id_colony=id_colony
+            )
+
+        if self.profiler is not None:
+            model_reporters.update(self.profiler.reporters())
+            for agent in self.schedule.agents:
+                self.profiler.instrument(agent)
 
-        self.datacollector = DataCollector(
-            model_reporters=model_reporters,
-            agent_reporters={},
+        # See Collector for the policies, with metrics_path the rows are streamed to a Parquet file
+        self.datacollector = Collector(
+            model_reporters,
+            policy=collect,
+            every=collect_every,
+            sink=(
+                ParquetSink(metrics_path, ["Step", *model_reporters])
+                if metrics_path is not None
+                else None
+            ),
         )
+        # With trajectory_path, the states of the agents are written to that file, see TrajectoryRecorder
+        self.recorder = None
+        if trajectory_path is not None:
+            self.record_trajectories(trajectory_path, trajectory_stride)
+
+    def record_trajectories(self, path, stride=1):
+        """
+        Record the states of the agents to ``path`` from now on, every
+        ``stride`` steps.
+        """
+        if self.engine is not None:
+            uids = self.engine.uid
+        else:
+            uids = sorted(agent.unique_id for agent in self.schedule.agents)
+        self.recorder = TrajectoryRecorder(path, uids, stride)
+        self.recorder.record(self)
+
+    def add_marker(self, x, y, colony_id, purpose, direction):
+        if self.pheromones is not None:
+            self.pheromones.deposit(colony_id, purpose, x, y)
+        else:
+            self.markers_dict[str(colony_id)].append(x, y, purpose, direction)
+
+    def food_index(self):
+        if self.foods_index is None:
+            self.foods_index = NearestIndex(
+                [food.x for food in self.foods], [food.y for food in self.foods]
+            )
+        return self.foods_index
+
+    def food_picked(self, id_colony):
+        return self.colonies[id_colony].food_picked
+
+    def count_markers(self, id_colony):
+        return len(self.markers_dict[str(id_colony)])
+
+    def count_ants(self, id_colony):
+        if self.engine is not None:
+            return self.engine.count(id_colony)
+        return len(self.colonies[id_colony].ants)
 
     def step(self):
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.begin_step()
+            created, expired = self.marker_counters()
+            start = time.perf_counter()
+
+        if self.engine is not None:
+            self.engine.step()
+        if profiler is not None:
+            start = profiler.lap("engine", start)
         self.schedule.step()
-        for keys in self.markers_dict.keys():
-            for mk in self.markers_dict[keys]:
-                if mk.lifetime == 0:
-                    self.markers_dict[keys].remove(mk)
-                else:
-                    mk.lifetime -= 1
-
-        for foodpoint in self.foods:
-            if foodpoint.stock == 0:
-                self.foods.remove(foodpoint)
-
-        for warrior in self.schedule.agents:
-            if isinstance(warrior, Warrior) and warrior.lifespan == 0:
-                self.schedule.remove(warrior)
-                self.colonies[warrior.colony.id_colony].warriors.remove(warrior)
+        if profiler is not None:
+            start = profiler.lap("agents", start)
+
+        for markers in self.markers_dict.values():
+            markers.expire()
+        if self.pheromones is not None:
+            self.pheromones.evaporate()
+        if profiler is not None:
+            start = profiler.lap("marker aging", start)
+
+        foods = [foodpoint for foodpoint in self.foods if foodpoint.stock > 0]
+        if len(foods) < len(self.foods):
+            self.foods = foods
+            self.foods_index = None
+        if profiler is not None:
+            start = profiler.lap("food removal", start)
+
+        self.remove_dead()
+        if profiler is not None:
+            start = profiler.lap("death removal", start)
+            now_created, now_expired = self.marker_counters()
+            profiler.count("markers created", now_created - created)
+            profiler.count("markers expired", now_expired - expired)
 
         self.datacollector.collect(self)
+        if self.recorder is not None:
+            self.recorder.record(self)
+        if profiler is not None:
+            start = profiler.lap("collection", start)
 
-        if not self.foods:
+        if (reason := self.stop_reason_of_step()) is not None:
             self.running = False
+            self.stop_reason = reason
+            self.stopped_at = self.schedule.steps
+            self.datacollector.close(self)
+            if self.recorder is not None:
+                self.recorder.close()
+        if profiler is not None:
+            profiler.lap("stop check", start)
+
+    def kill(self, agent):
+        """
+        ``agent`` leaves the ground at once, and the schedule and its colony
+        at the end of the step.
+        """
+        self.ants_grid.remove(agent)
+        self.schedule.kill(agent)
+
+    def remove_dead(self):
+        for agent in self.schedule.remove_dead():
+            if agent in self.ants_grid:
+                self.ants_grid.remove(agent)
+            colony = self.colonies[agent.colony.id_colony]
+            if isinstance(agent, Warrior):
+                del colony.warriors[agent.unique_id]
+            else:
+                del colony.ants[agent.unique_id]
+
+    def marker_counters(self):
+        """
+        Number of markers created and expired since the beginning of the run.
+        """
+        return (
+            sum(m.tail + m.offset for m in self.markers_dict.values()),
+            sum(m.head + m.offset for m in self.markers_dict.values()),
+        )
+
+    def stop_reason_of_step(self):
+        """
+        Reason to stop the run after the current step, or None to keep going.
+        """
+        steps = self.schedule.steps
+        food_picked = sum(colony.food_picked for colony in self.colonies)
+        if food_picked != self.last_food_picked:
+            self.last_food_picked = food_picked
+            self.last_food_picked_change = steps
+
+        if not self.foods:
+            return STOP_NO_FOOD
+        if (
+            self.stop_when_one_colony_left
+            and len(self.colonies) > 1
+            and sum(self.count_ants(id) > 0 for id in range(len(self.colonies))) <= 1
+        ):
+            return STOP_ONE_COLONY_LEFT
+        if (
+            self.stall_steps is not None
+            and steps - self.last_food_picked_change >= self.stall_steps
+        ):
+            return STOP_STALLED
+        if self.max_steps is not None and steps >= self.max_steps:
+            return STOP_MAX_STEPS
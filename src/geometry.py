@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+
+class Point:
+    def __init__(self, x: float, y: float):
+        self.x, self.y = x, y
+
+
+# ---- Scalar fast paths, on Python floats ----
+
+
+def move(x: float, y: float, speed: float, angle: float):
+    return x + speed * math.cos(angle), y + speed * math.sin(angle)
+
+
+# Square root of the sum of squares rather than math.hypot, so that compiled kernels round the same way
+def distance(x0: float, y0: float, x1: float, y1: float) -> float:
+    dx, dy = x1 - x0, y1 - y0
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def euclidean(p1, p2) -> float:
+    dx, dy = p1.x - p2.x, p1.y - p2.y
+    return math.sqrt(dx * dx + dy * dy)
+
+
+def heading(x0: float, y0: float, x1: float, y1: float, dist=None) -> float:
+    """
+    Angle in ``[-pi, pi]`` of the direction from ``(x0, y0)`` to
+    ``(x1, y1)``, ``dist`` being the distance between them if known.
+    """
+    if dist is None:
+        dx, dy = x1 - x0, y1 - y0
+        dist = math.sqrt(dx * dx + dy * dy)
+    angle = math.acos(max(-1.0, min(1.0, (x1 - x0) / dist)))
+    return -angle if y1 < y0 else angle
+
+
+# ---- Batch versions, on arrays (or an array and scalars) ----
+
+
+def move_many(x, y, speed, angle):
+    return x + speed * np.cos(angle), y + speed * np.sin(angle)
+
+
+def distances(x, y, xs, ys):
+    """
+    Distances from ``(x, y)`` to each of the points ``(xs, ys)``.
+    """
+    return np.hypot(xs - x, ys - y)
+
+
+def headings(x0, y0, x1, y1, dist=None):
+    """
+    Batch ``heading``, ``nan`` where the two points are the same.
+    """
+    if dist is None:
+        dist = np.hypot(x1 - x0, y1 - y0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        angle = np.arccos(np.clip((x1 - x0) / dist, -1, 1))
+    return np.where(y1 < y0, -angle, angle)
@@ -0,0 +1,111 @@
+import math
+from typing import Iterator
+
+
+class SpatialGrid:
+    """
+    Uniform grid bucketing objects with ``x`` and ``y`` attributes.
+
+    A radius query only visits the cells overlapping the query disc, so
+    with ``cell_size`` set to the largest radius ever queried it touches at
+    most 3x3 cells. Cells are keyed by their integer coordinates, positions
+    outside of the space are therefore supported.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.where = {}
+
+    def cell_of(self, x: float, y: float):
+        return int(math.floor(x / self.cell_size)), int(math.floor(y / self.cell_size))
+
+    def add(self, obj):
+        cell = self.cell_of(obj.x, obj.y)
+        self.cells.setdefault(cell, {})[id(obj)] = obj
+        self.where[id(obj)] = cell
+
+    def remove(self, obj):
+        cell = self.where.pop(id(obj), None)
+        if cell is not None:
+            bucket = self.cells[cell]
+            del bucket[id(obj)]
+            if not bucket:
+                del self.cells[cell]
+
+    def move(self, obj):
+        """
+        Update the cell of ``obj`` after its position changed.
+        """
+        cell = self.cell_of(obj.x, obj.y)
+        old_cell = self.where.get(id(obj))
+        if cell != old_cell:
+            self.remove(obj)
+            self.cells.setdefault(cell, {})[id(obj)] = obj
+            self.where[id(obj)] = cell
+
+    def __contains__(self, obj):
+        return id(obj) in self.where
+
+    def __len__(self):
+        return len(self.where)
+
+    def query(self, x: float, y: float, radius: float) -> Iterator:
+        """
+        Yield the objects strictly closer than ``radius`` to ``(x, y)``.
+        """
+        x_min, y_min = self.cell_of(x - radius, y - radius)
+        x_max, y_max = self.cell_of(x + radius, y + radius)
+        radius_sq = radius * radius
+        for cx in range(x_min, x_max + 1):
+            for cy in range(y_min, y_max + 1):
+                bucket = self.cells.get((cx, cy))
+                if bucket is None:
+                    continue
+                for obj in bucket.values():
+                    dx, dy = obj.x - x, obj.y - y
+                    if dx * dx + dy * dy < radius_sq:
+                        yield obj
+
+
+class PartitionedGrid:
+    """
+    One ``SpatialGrid`` per partition, ``key(obj)`` being the partition of
+    an object (which must not change while it is in the grid), so that a
+    query can skip whole partitions.
+    """
+
+    def __init__(self, cell_size: float, key):
+        self.cell_size = cell_size
+        self.key = key
+        self.grids = {}
+
+    def add(self, obj):
+        key = self.key(obj)
+        if key not in self.grids:
+            self.grids[key] = SpatialGrid(self.cell_size)
+        self.grids[key].add(obj)
+
+    def remove(self, obj):
+        grid = self.grids.get(self.key(obj))
+        if grid is not None:
+            grid.remove(obj)
+
+    def move(self, obj):
+        self.grids[self.key(obj)].move(obj)
+
+    def __contains__(self, obj):
+        grid = self.grids.get(self.key(obj))
+        return grid is not None and obj in grid
+
+    def __len__(self):
+        return sum(len(grid) for grid in self.grids.values())
+
+    def query(self, x: float, y: float, radius: float, exclude=None) -> Iterator:
+        """
+        Yield the objects strictly closer than ``radius`` to ``(x, y)``, but
+        the ones of the partition ``exclude``.
+        """
+        for key, grid in self.grids.items():
+            if key != exclude:
+                yield from grid.query(x, y, radius)
@@ -0,0 +1,515 @@
+import itertools
+import math
+
+import numpy as np
+
+import geometry
+from collision import MAX_ITERATIONS
+from engine import VectorizedEngine
+from marker import MarkerPurpose
+
+# Without numba, the kernels run as plain Python over the same arrays
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Most uniform random numbers drawn by an agent during a step: two rounds of
+# collision retries, then at most two epsilon draws and one angle draw
+DRAWS_PER_AGENT = 2 * MAX_ITERATIONS + 3
+FOOD = MarkerPurpose.FOOD.value
+DANGER = MarkerPurpose.DANGER.value
+
+
+def jit(function):
+    return function if njit is None else njit(cache=True)(function)
+
+
+move = jit(geometry.move)
+distance = jit(geometry.distance)
+heading = jit(geometry.heading)
+
+
+@jit
+def obstacle_crash(obstacles, resolution, x, y, speed, angle):
+    """
+    ``ObstacleMap.crashes`` for a single move, with the same samples.
+    """
+    n_samples = int(math.ceil(2 * max(speed, 0.0) / resolution)) + 1
+    n_rows, n_cols = obstacles.shape
+    step = 1.0 / (n_samples - 1)
+    cos, sin = math.cos(angle), math.sin(angle)
+    row = min(max(int(y / resolution), 0), n_rows - 1)
+    col = min(max(int(x / resolution), 0), n_cols - 1)
+    start = obstacles[row, col]
+    for k in range(1, n_samples):
+        t = 1.0 if k == n_samples - 1 else k * step
+        row = min(max(int((y + t * speed * sin) / resolution), 0), n_rows - 1)
+        col = min(max(int((x + t * speed * cos) / resolution), 0), n_cols - 1)
+        if obstacles[row, col] <= 0 and obstacles[row, col] < start:
+            return True
+    return False
+
+
+@jit
+def ants_crash(x, y, speed, angle, xs, ys, radius):
+    """
+    ``collision.segment_distances`` against the ants ``(xs, ys, radius)``,
+    stopping at the first crash.
+    """
+    vx, vy = speed * math.cos(angle), speed * math.sin(angle)
+    norm_v = math.sqrt(vx * vx + vy * vy)
+    for j in range(len(xs)):
+        wx, wy = xs[j] - x, ys[j] - y
+        prod = vx * wx + vy * wy
+        norm_h = abs(prod / norm_v)
+        if norm_h > norm_v:
+            dist = np.hypot(x + vx - xs[j], y + vy - ys[j])
+        elif prod < 0:
+            continue
+        else:
+            dist = math.sqrt(max(wx * wx + wy * wy - norm_h * norm_h, 0.0))
+        if dist <= radius[j]:
+            return True
+    return False
+
+
+@jit
+def crash(x, y, speed, angle, xs, ys, radius, obstacles, resolution, bounds):
+    """
+    ``collision.crashes`` for a single angle, ``bounds`` being the
+    ``(x_min, x_max, y_min, y_max)`` of the space.
+    """
+    next_x, next_y = move(x, y, speed, angle)
+    if (
+        next_x < bounds[0]
+        or next_x >= bounds[1]
+        or next_y < bounds[2]
+        or next_y >= bounds[3]
+    ):
+        return True
+    if ants_crash(x, y, speed, angle, xs, ys, radius):
+        return True
+    return obstacle_crash(obstacles, resolution, x, y, speed, angle)
+
+
+@jit
+def candidate_angle(initial_angle, iteration, draw):
+    shift = (iteration // 2 + 1) * draw * 2 * math.pi
+    return initial_angle + shift if iteration % 2 else initial_angle - shift
+
+
+@jit
+def choose_angle(
+    x,
+    y,
+    speed,
+    angle,
+    xs,
+    ys,
+    radius,
+    with_ants,
+    obstacles,
+    resolution,
+    bounds,
+    u,
+    used,
+):
+    """
+    ``collision.choose_angle``, ``u[used:]`` being the next uniforms of the
+    model. Return the angle and the number of uniforms used so far.
+    """
+    if not crash(x, y, speed, angle, xs, ys, radius, obstacles, resolution, bounds):
+        return angle, used
+    for k in range(MAX_ITERATIONS):
+        candidate = candidate_angle(angle, k, u[used + k])
+        if not crash(
+            x, y, speed, candidate, xs, ys, radius, obstacles, resolution, bounds
+        ):
+            return candidate, used + MAX_ITERATIONS
+    used += MAX_ITERATIONS
+    if with_ants:
+        # The ant couldn't avoid a crash with an obstacle or an ant, at least it avoids obstacles
+        for k in range(MAX_ITERATIONS):
+            candidate = candidate_angle(angle, k, u[used + k])
+            if not obstacle_crash(obstacles, resolution, x, y, speed, candidate):
+                return candidate, used + MAX_ITERATIONS
+        used += MAX_ITERATIONS
+    return angle, used
+
+
+@jit
+def go_to(x, y, speed, angle, tx, ty, tr, u, used):
+    """
+    ``Ant.go_to`` towards ``(tx, ty)``, ``tr`` being the radius of a food or
+    a colony (0 otherwise). Return the next position and angle, whether the
+    destination is reached and the number of uniforms used so far.
+    """
+    dist = distance(x, y, tx, ty)
+    if dist < speed or dist < tr:
+        return tx, ty, math.pi * (u[used] * 2 - 1), True, used + 1
+    next_x, next_y = move(x, y, speed, angle)
+    return next_x, next_y, heading(x, y, tx, ty, dist), False, used
+
+
+@jit
+def step_agents(
+    order,
+    x,
+    y,
+    angle,
+    speed,
+    sight,
+    colony,
+    epsilon,
+    is_warrior,
+    lifespan,
+    is_carrying,
+    is_on_food_marker,
+    ignore_markers_counts,
+    ignore_steps_after_marker,
+    visible,
+    dead,
+    colony_x,
+    colony_y,
+    colony_r,
+    food_picked,
+    food_x,
+    food_y,
+    food_r,
+    food_stock,
+    marker_x,
+    marker_y,
+    marker_start,
+    new_x,
+    new_y,
+    new_colony,
+    new_purpose,
+    new_direction,
+    obstacles,
+    resolution,
+    bounds,
+    u,
+):
+    """
+    ``Ant.step`` and ``Warrior.step`` of the agents of the rows ``order``,
+    one after the other. An agent killed during the step is marked as
+    ``dead`` and, unless it is a warrior at the end of its lifespan, is no
+    longer ``visible`` to the others.
+
+    The food markers of colony ``c`` alive at the beginning of the step are
+    ``marker_x[marker_start[c]:marker_start[c + 1]]`` (and ``marker_y``),
+    the ones created during the step are written to the ``new_`` arrays.
+    Return the number of markers created and of uniforms used.
+    """
+    n_new = 0
+    used = 0
+    no_ants = np.empty(0)
+    for i in order:
+        if dead[i]:
+            continue
+        c = colony[i]
+
+        if not is_warrior[i]:
+            # ---- Ant.step ----
+            dx, dy = x - x[i], y - y[i]
+            close = visible & (dx * dx + dy * dy < sight[i] * sight[i])
+            close[i] = False
+            angle[i], used = choose_angle(
+                x[i],
+                y[i],
+                speed[i],
+                angle[i],
+                x[close],
+                y[close],
+                speed[close],
+                True,
+                obstacles,
+                resolution,
+                bounds,
+                u,
+                used,
+            )
+            next_x, next_y = move(x[i], y[i], speed[i], angle[i])
+            next_angle = angle[i]
+
+            if is_carrying[i]:
+                next_x, next_y, next_angle, reached, used = go_to(
+                    x[i],
+                    y[i],
+                    speed[i],
+                    angle[i],
+                    colony_x[c],
+                    colony_y[c],
+                    colony_r[c],
+                    u,
+                    used,
+                )
+                if reached:
+                    food_picked[c] += 1
+                    is_carrying[i] = False
+                new_x[n_new], new_y[n_new], new_colony[n_new] = x[i], y[i], c
+                new_purpose[n_new], new_direction[n_new] = FOOD, next_angle
+                n_new += 1
+                ignore_markers_counts[i] += ignore_steps_after_marker
+
+            else:
+                food = -1
+                if len(food_x):
+                    dx, dy = food_x - x[i], food_y - y[i]
+                    dist = dx * dx + dy * dy
+                    food = np.argmin(dist)
+                    if dist[food] >= sight[i] * sight[i]:
+                        food = -1
+                eager = False
+                if food >= 0:
+                    eager = u[used] < epsilon[i]
+                    used += 1
+
+                if eager:
+                    next_x, next_y, next_angle, reached, used = go_to(
+                        x[i],
+                        y[i],
+                        speed[i],
+                        angle[i],
+                        food_x[food],
+                        food_y[food],
+                        food_r[food],
+                        u,
+                        used,
+                    )
+                    new_x[n_new], new_y[n_new], new_colony[n_new] = x[i], y[i], c
+                    new_purpose[n_new], new_direction[n_new] = FOOD, next_angle
+                    n_new += 1
+                    ignore_markers_counts[i] += ignore_steps_after_marker
+                    if reached:
+                        food_stock[food] -= 1
+                        is_carrying[i] = True
+
+                else:
+                    # Nearest food marker of the colony, wherever it is
+                    target_x, target_y, nearest = 0.0, 0.0, np.inf
+                    if ignore_markers_counts[i] == 0:
+                        start, end = marker_start[c], marker_start[c + 1]
+                        if end > start:
+                            dx, dy = (
+                                marker_x[start:end] - x[i],
+                                marker_y[start:end] - y[i],
+                            )
+                            dist = dx * dx + dy * dy
+                            j = np.argmin(dist)
+                            target_x, target_y = (
+                                marker_x[start + j],
+                                marker_y[start + j],
+                            )
+                            nearest = dist[j]
+                        for j in range(n_new):
+                            if new_colony[j] == c and new_purpose[j] == FOOD:
+                                dx, dy = new_x[j] - x[i], new_y[j] - y[i]
+                                if dx * dx + dy * dy < nearest:
+                                    target_x, target_y = new_x[j], new_y[j]
+                                    nearest = dx * dx + dy * dy
+                    follow = False
+                    if nearest < np.inf:
+                        follow = u[used] < epsilon[i]
+                        used += 1
+
+                    if follow:
+                        next_x, next_y, next_angle, reached, used = go_to(
+                            x[i],
+                            y[i],
+                            speed[i],
+                            angle[i],
+                            target_x,
+                            target_y,
+                            0.0,
+                            u,
+                            used,
+                        )
+                        if reached:
+                            is_on_food_marker[i] = True
+                    else:
+                        next_angle = math.pi * (u[used] * 2 - 1)
+                        used += 1
+
+            x[i], y[i], angle[i] = next_x, next_y, next_angle
+            ignore_markers_counts[i] = max(0, ignore_markers_counts[i] - 1)
+
+        else:
+            # ---- Warrior.step ----
+            angle[i], used = choose_angle(
+                x[i],
+                y[i],
+                speed[i],
+                angle[i],
+                no_ants,
+                no_ants,
+                no_ants,
+                False,
+                obstacles,
+                resolution,
+                bounds,
+                u,
+                used,
+            )
+            next_x, next_y = move(x[i], y[i], speed[i], angle[i])
+            next_angle = angle[i]
+
+            dx, dy = x - x[i], y - y[i]
+            dist = dx * dx + dy * dy
+            enemies = np.flatnonzero(
+                visible & (colony != c) & (dist < sight[i] * sight[i])
+            )
+            if len(enemies):
+                # Exact ties are broken by row rather than by position in the grid of the agents
+                prey = enemies[np.argmin(np.sqrt(dist[enemies]))]
+                next_x, next_y, next_angle, reached, used = go_to(
+                    x[i], y[i], speed[i], angle[i], x[prey], y[prey], 0.0, u, used
+                )
+                if reached:
+                    new_x[n_new], new_y[n_new] = x[prey], y[prey]
+                    new_colony[n_new], new_purpose[n_new] = colony[prey], DANGER
+                    new_direction[n_new] = angle[prey]
+                    n_new += 1
+                    ignore_markers_counts[i] += ignore_steps_after_marker
+
+                    dead[prey] = True
+                    visible[prey] = False
+                    if not is_warrior[prey]:
+                        lifespan[i] -= 1
+                        if lifespan[i] == 0:
+                            # The warrior stays on the ground until the end of the step
+                            dead[i] = True
+                        # The warrior goes back to its colony, the move being dropped as in Warrior.step
+                        _, _, _, at_colony, used = go_to(
+                            x[i],
+                            y[i],
+                            speed[i],
+                            angle[i],
+                            colony_x[c],
+                            colony_y[c],
+                            colony_r[c],
+                            u,
+                            used,
+                        )
+                        if at_colony:
+                            food_picked[c] += 1
+                            is_carrying[i] = False
+                    else:
+                        dead[i] = True
+                        visible[i] = False
+            else:
+                next_angle = math.pi * (u[used] * 2 - 1)
+                used += 1
+
+            x[i], y[i], angle[i] = next_x, next_y, next_angle
+
+    return n_new, used
+
+
+class KernelEngine(VectorizedEngine):
+    """
+    Ants and warriors stored as rows of arrays like ``VectorizedEngine``,
+    but stepped one after the other in a random order by ``step_agents``,
+    following ``Ant.step`` and ``Warrior.step`` exactly: with the same seed,
+    the trajectories are the ones of the agents engine. The kernels are
+    compiled by numba when it is installed.
+
+    The uniforms of a step are drawn at once from the model's generator,
+    which is then advanced by the number actually used. Only markers stored
+    as objects are supported.
+    """
+
+    def __init__(self, model, spawns):
+        super().__init__(model, spawns)
+        self.is_on_food_marker = np.zeros(len(spawns), dtype=bool)
+
+    def step(self):
+        model = self.model
+        # The rows are in the order of creation, shuffled like the keys of the scheduler
+        order = np.flatnonzero(self.alive).tolist()
+        model.random.shuffle(order)
+        order = np.array(order, dtype=np.int64)
+        if len(order) == 0:
+            return
+
+        bit_generator = self.rng.bit_generator
+        state = bit_generator.state
+        u = self.rng.random(len(order) * DRAWS_PER_AGENT)
+
+        colonies = model.colonies
+        foods = model.foods
+        food_stock = np.array([food.stock for food in foods], dtype=np.int64)
+        food_picked = np.array([c.food_picked for c in colonies], dtype=np.int64)
+
+        marker_x, marker_y, marker_start = [], [], [0]
+        for id_colony in range(len(colonies)):
+            markers = model.markers_dict[str(id_colony)]
+            food = markers.live("purpose") == FOOD
+            marker_x.append(markers.live("x")[food])
+            marker_y.append(markers.live("y")[food])
+            marker_start.append(marker_start[-1] + int(np.count_nonzero(food)))
+
+        # Each agent creates at most one marker
+        new_x, new_y = np.empty(len(order)), np.empty(len(order))
+        new_colony = np.empty(len(order), dtype=np.int64)
+        new_purpose = np.empty(len(order), dtype=np.int64)
+        new_direction = np.empty(len(order))
+
+        space = model.space
+        dead = np.zeros(len(self.alive), dtype=bool)
+        n_new, used = step_agents(
+            order,
+            self.x,
+            self.y,
+            self.angle,
+            self.speed,
+            self.sight,
+            self.colony,
+            self.epsilon,
+            self.is_warrior,
+            self.lifespan,
+            self.is_carrying,
+            self.is_on_food_marker,
+            self.ignore_markers_counts,
+            self.ignore_steps_after_marker,
+            self.alive.copy(),
+            dead,
+            np.array([c.x for c in colonies], dtype=float),
+            np.array([c.y for c in colonies], dtype=float),
+            np.array([c.r for c in colonies], dtype=float),
+            food_picked,
+            np.array([food.x for food in foods], dtype=float),
+            np.array([food.y for food in foods], dtype=float),
+            np.array([food.r for food in foods], dtype=float),
+            food_stock,
+            np.concatenate(marker_x),
+            np.concatenate(marker_y),
+            np.array(marker_start, dtype=np.int64),
+            new_x,
+            new_y,
+            new_colony,
+            new_purpose,
+            new_direction,
+            model.obstacle_map.distances,
+            model.obstacle_map.resolution,
+            np.array([space.x_min, space.x_max, space.y_min, space.y_max], dtype=float),
+            u,
+        )
+        bit_generator.state = state
+        bit_generator.advance(used)
+
+        self.alive &= ~dead
+        for food, stock in zip(foods, food_stock.tolist()):
+            food.stock = stock
+        for c, picked in zip(colonies, food_picked.tolist()):
+            c.food_picked = picked
+        # Markers are stored in the order of their creation
+        rows = range(n_new)
+        for (id_colony, purpose), run in itertools.groupby(
+            rows, key=lambda j: (int(new_colony[j]), int(new_purpose[j]))
+        ):
+            run = list(run)
+            model.markers_dict[str(id_colony)].extend(
+                new_x[run], new_y[run], MarkerPurpose(purpose), new_direction[run]
+            )
@@ -1,35 +1,50 @@
-import random
 import mesa
+import numpy as np
 import argparse
+import json
+import time
 import mesa.space
-from mesa.batchrunner import BatchRunner
 from mesa.visualization.modules import ChartModule
-from mesa.visualization.ModularVisualization import ModularServer
 
-from environnement import Ground
-from canvas import ContinuousCanvas
+from environnement import Ground, random_color
+from canvas import CanvasServer, ContinuousCanvas
+from cache import ResultCache
+from sweep import MAX_STEPS, run_sweep
 
+# Parameters of the headless runs, overridden by the config file and then by --param
+DEFAULT_PARAMS = {
+    "n_colonies": 2,
+    "n_ants": [10, 7],
+    "n_warriors": [3, 4],
+    "n_foods": 3,
+    "n_obstacles": 5,
+    "color_food": "#EAEA08",
+    "epsilons": [0.5, 0.3],
+    "speed": 15,
+}
 
-def run_single_server():
+
+def run_single_server(seed=None):
     n_colonies = 2
-    n_ants = [10, 7] # List of shape (n_colonies,)
-    n_warriors = [3, 4] # List of shape (n_colonies,)
-    epsilons = [.5, .3] # List of shape (n_colonies,)
+    n_ants = [10, 7]  # List of shape (n_colonies,)
+    n_warriors = [3, 4]  # List of shape (n_colonies,)
+    epsilons = [0.5, 0.3]  # List of shape (n_colonies,)
+    rng = np.random.default_rng(seed)
     colonies_colors = []
     markers_colors = []
     series = []
     for i in range(n_colonies):
-        colonies_colors.append("#"+''.join(random.choices('0123456789ABCDEF', k=6)))
-        markers_colors.append(["#"+''.join(random.choices('0123456789ABCDEF', k=6)),
-                              "#"+''.join(random.choices('0123456789ABCDEF', k=6))]) # element 0 for purpose FOOD and element 1 for DANGER
+        colonies_colors.append(random_color(rng))
+        # Element 0 for purpose FOOD and element 1 for DANGER
+        markers_colors.append([random_color(rng), random_color(rng)])
         series.append({"Label": "Ants " + str(i), "Color": markers_colors[i][0]})
         series.append({"Label": "Food picked " + str(i), "Color": colonies_colors[i]})
-              
+
     chart = ChartModule(
         series,
         data_collector_name="datacollector",
     )
-    
+
     model_params = {
         "n_colonies": n_colonies,
         "n_ants": n_ants,
@@ -46,50 +61,89 @@ def run_single_server():
             "slider", "Ant speed", 15, 5, 40, 5
         ),
         "allow_danger_markers": True,
-        "allow_info_markers": True
+        "allow_info_markers": True,
+        "seed": seed,
     }
 
-    server = ModularServer(
+    server = CanvasServer(
         Ground,
-        [ContinuousCanvas(), chart],
+        [ContinuousCanvas(delta=True, heatmap=True), chart],
         "Ants colonies",
-        model_params
+        model_params,
     )
     server.port = 8521
     server.launch()
 
 
-def run_batch():
-    series = []
-    model_reporters={}
-    for i in range(2):
-        series.append({"Label": "Ants " + str(i), "Color": "black"})
-        series.append({"Label": "Food picked " + str(i), "Color": "black"})
-        
-        model_reporters["Food picked " +str(i)]=eval("lambda model: model.colonies["+str(i)+"].food_picked")
-        model_reporters["Ants " + str(i)]=eval("lambda model: len(model.colonies["+str(i)+"].ants)") 
-    
-    batchrunner = BatchRunner(
-        model_cls = Ground,
-        variable_parameters={
-            "n_colonies": (2,),
-            "n_ants": ((10,10),),
-            "n_warriors": tuple((i,0) for i in range(10)),
-            "n_foods": (3,),
-            "n_obstacles": (5,),
-            "color_food": ("#EAEA08",),
-            "epsilons": ((.5, .5),),
-            "speed": (20,),
-            "allow_danger_markers": (True,),
-            "allow_info_markers": (True,)
-        },
-        model_reporters=model_reporters
-    )
-    batchrunner.run_all()
-    df = batchrunner.get_model_vars_dataframe()
+def run_batch(workers=1, seed=None, cache=None):
+    variable_parameters = {
+        "n_colonies": (2,),
+        "n_ants": ((10, 10),),
+        "n_warriors": tuple((i, 0) for i in range(10)),
+        "n_foods": (3,),
+        "n_obstacles": (5,),
+        "color_food": ("#EAEA08",),
+        "epsilons": ((0.5, 0.5),),
+        "speed": (20,),
+        "allow_danger_markers": (True,),
+        "allow_info_markers": (True,),
+    }
+    df = run_sweep(variable_parameters, workers=workers, seed=seed, cache=cache)
     return df
 
 
+def run_headless(params, steps=MAX_STEPS, collect_every=1, progress=0):
+    """
+    Step a ``Ground`` built from ``params`` without any visualization, up to
+    ``steps`` steps or until it stops, sampling its reporters every
+    ``collect_every`` steps (never if 0) unless ``params`` set another
+    ``collect`` policy. Every ``progress`` steps, the speed of the run is
+    printed.
+
+    Return the model, its reporters indexed by step and its steps per second.
+    """
+    model = Ground(**dict(params, collect_every=collect_every))
+    start = last = time.perf_counter()
+    while model.running and model.schedule.steps < steps:
+        model.step()
+        if progress and model.schedule.steps % progress == 0:
+            now = time.perf_counter()
+            print(f"step {model.schedule.steps}: {progress / (now - last):.1f} steps/s")
+            last = now
+    steps_per_sec = model.schedule.steps / (time.perf_counter() - start)
+
+    model.datacollector.close(model)
+    if model.recorder is not None:
+        model.recorder.close()
+    df = model.datacollector.get_model_vars_dataframe()
+    return model, df, steps_per_sec
+
+
+def run_params(config=None, overrides=(), seed=None):
+    """
+    ``DEFAULT_PARAMS`` overridden by the JSON file ``config``, then by the
+    ``(key, value)`` pairs of ``overrides`` and then by ``seed`` unless it
+    is None.
+    """
+    params = dict(DEFAULT_PARAMS)
+    if config is not None:
+        with open(config) as f:
+            params.update(json.load(f))
+    params.update(overrides)
+    if seed is not None:
+        params["seed"] = seed
+    return params
+
+
+def parse_param(param):
+    # KEY=VALUE, VALUE being JSON or else a plain string
+    key, _, value = param.partition("=")
+    try:
+        return key, json.loads(value)
+    except json.JSONDecodeError:
+        return key, value
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
@@ -101,16 +155,111 @@ if __name__ == "__main__":
         help="if 0 runs notebook in singular server mode, else runs notebook in batch mode (default: 0)",
     )
     parser.add_argument(
-        "-n",
-        "--name",
-        default="exp.csv",
+        "-n", "--name", default="exp.csv", type=str, help="name of the result dataframe"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        default=1,
+        type=int,
+        help="number of processes running the batch in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "-s",
+        "--seed",
+        default=None,
+        type=int,
+        help="seed of the model, or from which the seed of every run of the batch is derived (default: random)",
+    )
+    parser.add_argument(
+        "--cache",
+        default=None,
+        type=str,
+        help="directory where the results of the batch runs are cached, so that reruns only run new points, requires --seed (default: no cache)",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser(
+        "run", help="run a single model as fast as possible, without the server"
+    )
+    run_parser.add_argument(
+        "-c",
+        "--config",
+        default=None,
+        type=str,
+        help="JSON file of the parameters of Ground",
+    )
+    run_parser.add_argument(
+        "-p",
+        "--param",
+        action="append",
+        default=[],
+        type=parse_param,
+        help="parameter of Ground as KEY=VALUE, VALUE being JSON (e.g. -p n_ants=[100,100] -p engine=vectorized)",
+    )
+    run_parser.add_argument(
+        "--steps",
+        default=MAX_STEPS,
+        type=int,
+        help=f"maximum number of steps (default: {MAX_STEPS})",
+    )
+    run_parser.add_argument(
+        "-k",
+        "--collect_every",
+        default=1,
+        type=int,
+        help="collect the reporters every K steps, 0 to never collect them (default: 1)",
+    )
+    run_parser.add_argument(
+        "--progress",
+        default=0,
+        type=int,
+        help="print the speed of the run every N steps (default: never)",
+    )
+    run_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time the phases of the steps and print a summary at the end",
+    )
+    run_parser.add_argument(
+        "-o",
+        "--output",
+        default=None,
         type=str,
-        help="name of the result dataframe"
+        help="CSV file of the collected reporters",
+    )
+    run_parser.add_argument(
+        "-s",
+        "--seed",
+        default=argparse.SUPPRESS,
+        type=int,
+        help="seed of the model (default: random)",
     )
     args = parser.parse_args()
+    if args.cache is not None and args.seed is None:
+        # Without a seed, every batch gets fresh seeds and never hits the cache
+        parser.error("--cache requires --seed")
 
-    if args.run_batch:
-        df = run_batch()
+    if args.command == "run":
+        params = run_params(args.config, args.param, args.seed)
+        if args.profile:
+            params["profile"] = True
+        model, df, steps_per_sec = run_headless(
+            params,
+            steps=args.steps,
+            collect_every=args.collect_every,
+            progress=args.progress,
+        )
+        print(
+            f"{model.schedule.steps} steps in {model.schedule.steps / steps_per_sec:.2f}s "
+            f"({steps_per_sec:.1f} steps/s), stop reason: {model.stop_reason}"
+        )
+        if model.profiler is not None:
+            print(model.profiler.summary().to_string())
+        if args.output is not None:
+            df.to_csv(args.output)
+    elif args.run_batch:
+        cache = None if args.cache is None else ResultCache(args.cache)
+        df = run_batch(workers=args.workers, seed=args.seed, cache=cache)
         df.to_csv(args.name)
     else:
-        run_single_server()
+        run_single_server(seed=args.seed)
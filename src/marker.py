@@ -1,7 +1,13 @@
 import enum
+import numpy as np
+from collections import namedtuple
+from nearest import NearestIndex
 
 LIFETIME = 50
 
+# KD-tree over the markers of a purpose, ``head`` and ``tail`` being the live rows when it was built
+MarkerIndex = namedtuple("MarkerIndex", ["tree", "ids", "head", "tail", "tick"])
+
 
 class MarkerPurpose(enum.Enum):
     DANGER = enum.auto()
@@ -9,6 +15,8 @@ class MarkerPurpose(enum.Enum):
 
 
 class Marker:
+    __slots__ = ("x", "y", "colony_id", "purpose", "color", "lifetime", "direction")
+
     def __init__(self, x, y, colony_id, purpose, direction, color):
         self.x = x
         self.y = y
@@ -28,3 +36,193 @@ class Marker:
             "r": 1,
         }
         return portrayal
+
+
+class MarkerStore:
+    """
+    Markers of a colony stored as NumPy columns, the colors coming from a
+    table shared by the markers of each purpose.
+
+    Markers are appended in the order of their creation, so the live ones
+    are the rows ``[head, tail)`` sorted by creation step and expiring a
+    step only moves ``head``. Rows are identified by ``offset + row``,
+    which stays valid until the marker expires.
+    """
+
+    def __init__(self, colony_id, colors, lifetime=LIFETIME, capacity=256):
+        self.colony_id = colony_id
+        self.colors = {MarkerPurpose.FOOD: colors[0], MarkerPurpose.DANGER: colors[1]}
+        self.lifetime = lifetime
+        self.tick = 0
+        self.head = self.tail = self.offset = 0
+        self.x = np.empty(capacity)
+        self.y = np.empty(capacity)
+        self.direction = np.empty(capacity, dtype=np.float32)
+        self.birth = np.empty(capacity, dtype=np.int32)
+        self.purpose = np.empty(capacity, dtype=np.uint8)
+        self.indexes = {}
+
+    def columns(self):
+        return ("x", "y", "direction", "birth", "purpose")
+
+    def reserve(self, n):
+        """
+        Make room for ``n`` more rows, either by moving the live rows to the
+        front or by doubling the capacity.
+        """
+        capacity = len(self.x)
+        if self.tail + n <= capacity:
+            return
+        size = self.tail - self.head
+        if size + n > capacity // 2:
+            capacity = max(2 * capacity, size + n)
+        for name in self.columns():
+            column = getattr(self, name)
+            new = np.empty(capacity, dtype=column.dtype)
+            new[:size] = column[self.head : self.tail]
+            setattr(self, name, new)
+        self.offset += self.head
+        self.head, self.tail = 0, size
+
+    def append(self, x, y, purpose, direction=0.0):
+        self.extend([x], [y], purpose, [direction])
+
+    def extend(self, x, y, purpose, direction):
+        n = len(x)
+        self.reserve(n)
+        rows = slice(self.tail, self.tail + n)
+        self.x[rows], self.y[rows] = x, y
+        self.direction[rows] = direction
+        self.birth[rows] = self.tick
+        self.purpose[rows] = purpose.value
+        self.tail += n
+
+    def expire(self):
+        """
+        End the current step and drop the markers created ``lifetime`` steps ago.
+        """
+        self.tick += 1
+        self.head += int(
+            np.searchsorted(
+                self.birth[self.head : self.tail],
+                self.tick - self.lifetime - 1,
+                side="right",
+            )
+        )
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def live(self, name):
+        return getattr(self, name)[self.head : self.tail]
+
+    def get(self, i):
+        """
+        Marker of the live row ``i``.
+        """
+        row = self.head + i
+        purpose = MarkerPurpose(int(self.purpose[row]))
+        marker = Marker(
+            x=float(self.x[row]),
+            y=float(self.y[row]),
+            colony_id=self.colony_id,
+            purpose=purpose,
+            direction=float(self.direction[row]),
+            color=self.colors[purpose],
+        )
+        marker.lifetime = int(self.birth[row]) + self.lifetime - self.tick
+        return marker
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.get(i)
+
+    def index(self, purpose):
+        """
+        KD-tree over the live markers of ``purpose``. It is rebuilt lazily, at
+        most once per step and only if markers were added or expired: the
+        markers appended after the build are scanned linearly.
+        """
+        head, tail = self.head + self.offset, self.tail + self.offset
+        built = self.indexes.get(purpose)
+        if built is None or (
+            built.tick != self.tick and (built.head != head or built.tail != tail)
+        ):
+            rows = np.flatnonzero(self.live("purpose") == purpose.value) + self.head
+            built = MarkerIndex(
+                tree=NearestIndex(self.x[rows], self.y[rows]),
+                ids=rows + self.offset,
+                head=head,
+                tail=tail,
+                tick=self.tick,
+            )
+            self.indexes[purpose] = built
+        return built
+
+    def pending(self, purpose, built):
+        """
+        Live rows of ``purpose`` appended since ``built``.
+        """
+        start = max(built.tail - self.offset, self.head)
+        rows = np.arange(start, self.tail)
+        return rows[self.purpose[rows] == purpose.value]
+
+    def nearest(self, x, y, purpose, towards=None):
+        """
+        Live row of the marker of ``purpose`` nearest to ``(x, y)``, or -1.
+        With ``towards``, only markers on the side of that position count.
+        """
+        built = self.index(purpose)
+        tree, ids = built.tree, built.ids
+
+        def on_side(mx, my):
+            return (x - towards[0]) * (x - mx) + (y - towards[1]) * (y - my) > 0
+
+        predicate = None
+        if towards is not None:
+
+            def predicate(i):
+                return on_side(tree.xs[i], tree.ys[i])
+
+        i, dist = tree.nearest_within(x, y, predicate=predicate)
+        best = -1 if i < 0 else int(ids[i]) - self.offset
+
+        rows = self.pending(purpose, built)
+        if towards is not None:
+            rows = rows[on_side(self.x[rows], self.y[rows])]
+        if len(rows):
+            pending_dist = np.hypot(self.x[rows] - x, self.y[rows] - y)
+            j = int(np.argmin(pending_dist))
+            if pending_dist[j] < dist:
+                best = int(rows[j])
+
+        return -1 if best < 0 else best - self.head
+
+    def nearest_many(self, xs, ys, purpose):
+        """
+        Live rows of the markers of ``purpose`` nearest to each ``(xs[i], ys[i])``
+        (-1 when there is no marker), and their positions.
+        """
+        built = self.index(purpose)
+        tree, ids = built.tree, built.ids
+        i, dist = tree.nearest_many(xs, ys)
+        best = (
+            np.where(i >= 0, ids[np.maximum(i, 0)] - self.offset, -1) if len(ids) else i
+        )
+
+        rows = self.pending(purpose, built)
+        if len(rows):
+            pending = NearestIndex(self.x[rows], self.y[rows])
+            j, pending_dist = pending.nearest_many(xs, ys)
+            best = np.where(pending_dist < dist, rows[j], best)
+
+        found = best >= 0
+        return (
+            np.where(found, best - self.head, -1),
+            np.where(found, self.x[best], np.nan),
+            np.where(found, self.y[best], np.nan),
+        )
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.columns())
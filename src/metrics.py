@@ -0,0 +1,189 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # ParquetSink is unavailable without pyarrow
+    pa = pq = None
+
+POLICIES = ("every", "on_change", "end")
+CHUNK_ROWS = 4096  # Rows kept in memory by ParquetSink before writing them
+
+
+class ColumnBuffer:
+    """
+    Rows of values stored as one NumPy column per name, doubling their
+    capacity when full. The dtype of a column is the one of its first value.
+    """
+
+    def __init__(self, names, capacity=1024):
+        self.names = list(names)
+        self.capacity = capacity
+        self.size = 0
+        self.columns = None
+
+    def __len__(self):
+        return self.size
+
+    def append(self, row):
+        if self.columns is None:
+            self.columns = {
+                name: np.empty(self.capacity, dtype=np.asarray(row[name]).dtype)
+                for name in self.names
+            }
+        if self.size == self.capacity:
+            self.capacity *= 2
+            for name, column in self.columns.items():
+                self.columns[name] = np.resize(column, self.capacity)
+        for name in self.names:
+            self.columns[name][self.size] = row[name]
+        self.size += 1
+
+    def column(self, name):
+        if self.columns is None:
+            return np.empty(0)
+        return self.columns[name][: self.size]
+
+    def clear(self):
+        self.size = 0
+
+    def to_frame(self):
+        return pd.DataFrame({name: self.column(name) for name in self.names})
+
+
+class ParquetSink:
+    """
+    Rows streamed to the Parquet file ``path``, ``chunk_rows`` at a time,
+    so that the memory used doesn't grow with the number of rows.
+
+    A Parquet file can't be appended to once written, so the sink takes no
+    more rows after ``close`` (or ``to_frame``, which closes it).
+    """
+
+    def __init__(self, path, names, chunk_rows=CHUNK_ROWS):
+        if pq is None:
+            raise ImportError("ParquetSink requires pyarrow")
+        self.path = path
+        self.names = list(names)
+        self.chunk_rows = chunk_rows
+        self.buffer = ColumnBuffer(names, capacity=chunk_rows)
+        self.writer = None
+        self.written = False
+        self.closed = False
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def append(self, row):
+        if self.closed:
+            raise ValueError(f"ParquetSink {self.path} is closed")
+        self.buffer.append(row)
+        if len(self.buffer) == self.chunk_rows:
+            self.flush()
+
+    def column(self, name):
+        return self.buffer.column(name)
+
+    def flush(self):
+        if not len(self.buffer):
+            return
+        table = pa.table({name: self.buffer.column(name) for name in self.names})
+        if self.writer is None:
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+        self.written = True
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.closed = True
+
+    def to_frame(self):
+        # The file can only be read once closed
+        self.close()
+        if not self.written:
+            return self.buffer.to_frame()
+        return pq.read_table(self.path).to_pandas()
+
+
+class Collector:
+    """
+    Replacement of mesa's ``DataCollector`` for model reporters only,
+    storing a row per collection (the step and the value of each reporter)
+    in ``sink``, a ``ColumnBuffer`` unless given.
+
+    With the policy ``"every"``, the reporters are collected every ``every``
+    steps (never if ``every`` is 0), with ``"on_change"`` a row is only
+    stored when a value changed and with ``"end"`` the single row is stored
+    by ``close``.
+
+    A ``ColumnBuffer`` keeps every row in memory, so with the policy
+    ``"every"`` its memory grows linearly with the steps. Long runs should
+    stream the rows to a ``ParquetSink`` (which needs pyarrow), or collect
+    less often.
+    """
+
+    def __init__(self, model_reporters, policy="every", every=1, sink=None):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        self.model_reporters = model_reporters
+        self.policy = policy
+        self.every = every
+        self.sink = sink if sink is not None else ColumnBuffer(self.names())
+        self.last = None
+        self.last_step = None
+        self.closed = False
+
+    def names(self):
+        return ["Step", *self.model_reporters]
+
+    @property
+    def model_vars(self):
+        """
+        Last value of each reporter as a one-item list, so that
+        ``model_vars[name][-1]`` reads it as with ``DataCollector`` (for
+        ``ChartModule``, on every frame). The whole history is in ``sink``.
+        """
+        if self.last is None:
+            return {name: [] for name in self.model_reporters}
+        return {name: [value] for name, value in self.last.items()}
+
+    def values(self, model):
+        return {
+            name: reporter(model) for name, reporter in self.model_reporters.items()
+        }
+
+    def record(self, step, row):
+        self.sink.append(dict(row, Step=step))
+        self.last, self.last_step = row, step
+
+    def collect(self, model):
+        step = model.schedule.steps
+        if self.policy == "end" or (
+            self.policy == "every" and (not self.every or step % self.every)
+        ):
+            return
+        row = self.values(model)
+        if self.policy == "on_change" and row == self.last:
+            return
+        self.record(step, row)
+
+    def close(self, model):
+        """
+        End of the run: store the final row with the policy ``"end"`` and
+        close the sink.
+        """
+        if self.closed:
+            return
+        if self.policy == "end":
+            self.record(model.schedule.steps, self.values(model))
+        if isinstance(self.sink, ParquetSink):
+            self.sink.close()
+        self.closed = True
+
+    def get_model_vars_dataframe(self):
+        return self.sink.to_frame().set_index("Step")
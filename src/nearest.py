@@ -0,0 +1,83 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # Without scipy, queries fall back to a linear scan
+    cKDTree = None
+
+FIRST_K = 8  # Neighbors fetched by the first round of a filtered query
+
+
+class NearestIndex:
+    """
+    Static set of points answering nearest-neighbor queries in logarithmic
+    time with a KD-tree. Build a new index when the points change.
+    """
+
+    def __init__(self, xs, ys):
+        self.xs = np.asarray(xs, dtype=float)
+        self.ys = np.asarray(ys, dtype=float)
+        self.tree = (
+            cKDTree(np.column_stack([self.xs, self.ys]))
+            if cKDTree is not None and len(self.xs)
+            else None
+        )
+
+    def __len__(self):
+        return len(self.xs)
+
+    def nearest_within(self, x, y, radius=np.inf, predicate=None):
+        """
+        Index and distance of the point nearest to ``(x, y)``, strictly closer
+        than ``radius``, for which ``predicate`` (called on an array of
+        indices, returning a mask) holds. The index is -1 if there is none.
+        """
+        n = len(self)
+        if n == 0:
+            return -1, np.inf
+
+        if self.tree is None:
+            dist = np.hypot(self.xs - x, self.ys - y)
+            candidates = dist < radius
+            if predicate is not None:
+                candidates &= predicate(np.arange(n))
+            if not candidates.any():
+                return -1, np.inf
+            i = int(np.argmin(np.where(candidates, dist, np.inf)))
+            return i, dist[i]
+
+        # Fetch more and more neighbors until one of them satisfies the predicate
+        k = 1 if predicate is None else min(FIRST_K, n)
+        while True:
+            dist, idx = self.tree.query(
+                (x, y), k=[*range(1, k + 1)], distance_upper_bound=radius
+            )
+            found = idx < n
+            if predicate is not None and found.any():
+                found[found] = predicate(idx[found])
+            if found.any():
+                first = np.argmax(found)
+                return int(idx[first]), dist[first]
+            if k == n or not np.isfinite(dist[-1]):
+                return -1, np.inf
+            k = min(4 * k, n)
+
+    def nearest_many(self, xs, ys, radius=np.inf):
+        """
+        Indices and distances of the points nearest to each ``(xs[i], ys[i])``,
+        -1 and ``inf`` when none is closer than ``radius``.
+        """
+        xs, ys = np.asarray(xs, dtype=float), np.asarray(ys, dtype=float)
+        n = len(self)
+        if n == 0 or len(xs) == 0:
+            return np.full(len(xs), -1), np.full(len(xs), np.inf)
+        if self.tree is None:
+            dist = np.hypot(xs[:, None] - self.xs[None], ys[:, None] - self.ys[None])
+            idx = dist.argmin(axis=1)
+            dist = dist[np.arange(len(xs)), idx]
+        else:
+            dist, idx = self.tree.query(
+                np.column_stack([xs, ys]), distance_upper_bound=np.max(radius)
+            )
+        found = (idx < n) & (dist < radius)
+        return np.where(found, idx, -1), np.where(found, dist, np.inf)
@@ -0,0 +1,337 @@
+import os
+import weakref
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from engine import VectorizedEngine
+from geometry import move_many
+from marker import MarkerStore
+from nearest import NearestIndex
+from obstacle_map import ObstacleMap
+from pheromone import PheromoneField
+
+CHUNK_SIZE = 2048  # Agents planned by one task, whatever the number of workers
+# Columns of the engine read by the workers, then the ones they write for the agents they plan
+SHARED_COLUMNS = (
+    "x",
+    "y",
+    "speed",
+    "sight",
+    "colony",
+    "epsilon",
+    "is_warrior",
+    "alive",
+)
+PLANNED_COLUMNS = ("angle", "is_carrying", "ignore_markers_counts")
+NEXT_COLUMNS = ("next_x", "next_y", "next_angle")
+
+# What the workers need of the ContinuousSpace
+Bounds = namedtuple("Bounds", ["x_min", "x_max", "y_min", "y_max"])
+
+
+class SharedArrays:
+    """
+    NumPy arrays copied to shared memory blocks, one per name. A block is
+    only replaced when an array outgrows it, so that workers attach to it
+    once.
+    """
+
+    def __init__(self):
+        self.blocks = {}
+
+    def put(self, name, array):
+        """
+        Copy ``array`` to the block ``name`` and return what ``attach`` needs.
+        """
+        array = np.ascontiguousarray(array)
+        block = self.blocks.get(name)
+        if block is None or block.size < array.nbytes:
+            if block is not None:
+                block.close()
+                block.unlink()
+            # Growing arrays (the markers) get room for twice their size
+            block = SharedMemory(create=True, size=max(2 * array.nbytes, 1))
+            self.blocks[name] = block
+        self.view(name, array.shape, array.dtype)[...] = array
+        return block.name, array.shape, array.dtype.str
+
+    def view(self, name, shape, dtype):
+        return np.ndarray(shape, dtype=dtype, buffer=self.blocks[name].buf)
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+# Blocks attached by a worker process and what it built for the current tick
+attached = {}
+worker_tick = {"tick": None}
+
+
+def attach(spec):
+    name, shape, dtype = spec
+    if name not in attached:
+        attached[name] = SharedMemory(name=name)
+    return np.ndarray(shape, dtype=dtype, buffer=attached[name].buf)
+
+
+class ChunkModel:
+    """
+    What the planning of ``VectorizedEngine`` reads from a ``Ground``, as
+    it was at the beginning of the tick.
+    """
+
+    def __init__(self, context, arrays):
+        self.space = context["space"]
+        self.obstacle_map = ObstacleMap.__new__(ObstacleMap)
+        self.obstacle_map.resolution = context["resolution"]
+        self.obstacle_map.distances = arrays["obstacles"]
+        self.foods = context["foods"]
+        self.ignore_steps_after_marker = context["ignore_steps_after_marker"]
+        self.foods_index = None
+        self.colonies = [
+            Colony(id_colony, x, y, r)
+            for id_colony, (x, y, r) in enumerate(context["colonies"])
+        ]
+        self.pheromones = None
+        if "pheromones" in arrays:
+            self.pheromones = PheromoneField.__new__(PheromoneField)
+            self.pheromones.resolution = context["pheromone_resolution"]
+            self.pheromones.values = arrays["pheromones"]
+        self.markers_dict = {}
+        for id_colony in range(len(self.colonies)):
+            # Read only stores: their KD-trees are built once per tick and worker
+            markers = MarkerStore(id_colony, ("", ""))
+            markers.tail = len(arrays[f"markers{id_colony}_x"])
+            for column in ("x", "y", "purpose"):
+                column_array = arrays[f"markers{id_colony}_{column}"]
+                if markers.tail == 0:
+                    # ``nearest_many`` reads a row even when there is no marker
+                    column_array = np.zeros(1, dtype=column_array.dtype)
+                setattr(markers, column, column_array)
+            self.markers_dict[str(id_colony)] = markers
+
+    def food_index(self):
+        if self.foods_index is None:
+            self.foods_index = NearestIndex(
+                [food.x for food in self.foods], [food.y for food in self.foods]
+            )
+        return self.foods_index
+
+
+class Colony:
+    def __init__(self, id_colony, x, y, r):
+        self.id_colony = id_colony
+        self.x, self.y, self.r = x, y, r
+        self.food_picked = 0
+
+
+class ChunkEngine(VectorizedEngine):
+    """
+    ``VectorizedEngine`` planning the moves of some agents from the state of
+    the tick, without touching what the other agents or the model own:
+    markers, pickups of food and fights are recorded for the main process.
+    """
+
+    def __init__(self, model, columns, rng):
+        self.model = model
+        self.rng = rng
+        self.ignore_steps_after_marker = model.ignore_steps_after_marker
+        for name, column in columns.items():
+            setattr(self, name, column)
+        self.drops, self.claims = [], []
+
+    def drop_food_markers(self, idx, direction):
+        self.drops.append((idx, direction))
+        self.ignore_markers_counts[idx] += self.ignore_steps_after_marker
+
+    def pick_food(self, ants, targets):
+        self.claims.append((ants, targets))
+
+    def plan(self, idx):
+        # The model's colonies are shared by the chunks of a worker
+        food_picked = [colony.food_picked for colony in self.model.colonies]
+        self.angle[idx] = self.avoid_crashes(idx)
+        self.next_x[idx], self.next_y[idx] = move_many(
+            self.x[idx], self.y[idx], self.speed[idx], self.angle[idx]
+        )
+        self.next_angle[idx] = self.angle[idx]
+        self.step_foragers(
+            idx[~self.is_warrior[idx]], self.next_x, self.next_y, self.next_angle
+        )
+        hunters, preys, reached = self.hunt(
+            idx[self.is_warrior[idx]], self.next_x, self.next_y, self.next_angle
+        )
+        return {
+            "food_picked": np.array([c.food_picked for c in self.model.colonies])
+            - food_picked,
+            "drops": concatenate(self.drops, 2),
+            "claims": concatenate(self.claims, 2),
+            "hunts": (hunters, preys, reached),
+        }
+
+
+def concatenate(pairs, n):
+    if not pairs:
+        return tuple(np.empty(0, dtype=np.int64) for _ in range(n))
+    return tuple(np.concatenate(arrays) for arrays in zip(*pairs))
+
+
+def plan_chunk(task):
+    """
+    Plan the moves of the agents ``rows`` of a tick in a worker, the state
+    of the tick being in the shared blocks of ``specs``.
+    """
+    tick, seed, chunk, rows, specs, context = task
+    if worker_tick["tick"] != tick:
+        worker_tick.clear()
+        arrays = {name: attach(spec) for name, spec in specs.items()}
+        worker_tick.update(tick=tick, arrays=arrays, model=ChunkModel(context, arrays))
+        # Blocks replaced since the previous tick are released
+        live = {spec[0] for spec in specs.values()}
+        for name in [name for name in attached if name not in live]:
+            attached.pop(name).close()
+    arrays, model = worker_tick["arrays"], worker_tick["model"]
+    columns = {
+        name: arrays[name] for name in SHARED_COLUMNS + PLANNED_COLUMNS + NEXT_COLUMNS
+    }
+    engine = ChunkEngine(model, columns, np.random.default_rng([seed, chunk]))
+    return engine.plan(rows)
+
+
+def release(executor, shared):
+    if executor is not None:
+        executor.shutdown()
+    shared.close()
+
+
+class ParallelEngine(VectorizedEngine):
+    """
+    ``VectorizedEngine`` whose agents are planned in chunks of
+    ``chunk_size`` by a pool of ``workers`` processes (in this process if
+    ``workers`` is 1), the state of the tick being shared with them through
+    shared memory. Waiting for every chunk is the barrier of the tick.
+
+    Each chunk draws from its own generator, seeded by the model's
+    generator and the chunk, so that runs don't depend on the number of
+    workers. What agents of different chunks may compete for is then
+    applied by this process, in an order which only depends on the seed:
+    foods are given to the ants which reached them by increasing
+    ``unique_id`` while their stock lasts, and fights are resolved one at
+    a time in random order as with ``VectorizedEngine``. Markers dropped
+    during a tick are seen from the next one.
+    """
+
+    def __init__(self, model, spawns, workers=None, chunk_size=CHUNK_SIZE):
+        super().__init__(model, spawns)
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.tick = 0
+        self.shared = SharedArrays()
+        # Worker processes are only started by the first tick
+        self.executor = (
+            ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        )
+        self.close = weakref.finalize(self, release, self.executor, self.shared)
+
+    def context(self):
+        model = self.model
+        space = model.space
+        context = {
+            "space": Bounds(space.x_min, space.x_max, space.y_min, space.y_max),
+            "resolution": model.obstacle_map.resolution,
+            "foods": model.foods,
+            "ignore_steps_after_marker": self.ignore_steps_after_marker,
+            "colonies": [(c.x, c.y, c.r) for c in model.colonies],
+        }
+        if model.pheromones is not None:
+            context["pheromone_resolution"] = model.pheromones.resolution
+        return context
+
+    def markers(self):
+        arrays = {}
+        for id_colony, markers in self.model.markers_dict.items():
+            for column in ("x", "y", "purpose"):
+                arrays[f"markers{id_colony}_{column}"] = markers.live(column)
+        if self.model.pheromones is not None:
+            arrays["pheromones"] = self.model.pheromones.values
+        return arrays
+
+    def plan(self, chunks, seed):
+        n = len(self.x)
+        next_columns = {name: np.empty(n) for name in NEXT_COLUMNS}
+        if self.workers == 1:
+            model = ChunkModel(
+                self.context(),
+                dict(self.markers(), obstacles=self.model.obstacle_map.distances),
+            )
+            columns = {
+                name: getattr(self, name) for name in SHARED_COLUMNS + PLANNED_COLUMNS
+            }
+            columns.update(next_columns)
+            plans = [
+                ChunkEngine(model, columns, np.random.default_rng([seed, chunk])).plan(
+                    rows
+                )
+                for chunk, rows in enumerate(chunks)
+            ]
+            return plans, next_columns
+
+        arrays = {
+            name: getattr(self, name) for name in SHARED_COLUMNS + PLANNED_COLUMNS
+        }
+        arrays.update(next_columns)
+        arrays.update(self.markers())
+        arrays["obstacles"] = self.model.obstacle_map.distances
+        specs = {name: self.shared.put(name, array) for name, array in arrays.items()}
+        context = self.context()
+        tasks = [
+            (self.tick, seed, chunk, rows, specs, context)
+            for chunk, rows in enumerate(chunks)
+        ]
+        plans = list(self.executor.map(plan_chunk, tasks))
+        for name in PLANNED_COLUMNS:
+            getattr(self, name)[...] = self.shared.view(name, *specs[name][1:])
+        for name in NEXT_COLUMNS:
+            next_columns[name][...] = self.shared.view(name, *specs[name][1:])
+        return plans, next_columns
+
+    def share_food(self, ants, targets):
+        """
+        Give a piece of its food to each of the ``ants`` which reached one,
+        by increasing ``unique_id`` while the stock lasts.
+        """
+        order = np.argsort(self.uid[ants], kind="stable")
+        super().pick_food(ants[order], targets[order])
+
+    def step(self):
+        idx = np.flatnonzero(self.alive)
+        if len(idx) == 0:
+            return
+        self.tick += 1
+        seed = int(self.rng.integers(2**63))
+        chunks = np.array_split(idx, -(-len(idx) // self.chunk_size))
+        plans, next_columns = self.plan(chunks, seed)
+
+        colonies = self.model.colonies
+        for plan in plans:
+            for colony, picked in zip(colonies, plan["food_picked"].tolist()):
+                colony.food_picked += picked
+        self.share_food(*concatenate([plan["claims"] for plan in plans], 2))
+        self.add_food_markers(*concatenate([plan["drops"] for plan in plans], 2))
+        self.fight(*concatenate([plan["hunts"] for plan in plans], 3))
+
+        # Update ant states
+        self.x[idx] = next_columns["next_x"][idx]
+        self.y[idx] = next_columns["next_y"][idx]
+        self.angle[idx] = next_columns["next_angle"][idx]
+        foragers = idx[~self.is_warrior[idx]]
+        self.ignore_markers_counts[foragers] = np.maximum(
+            0, self.ignore_markers_counts[foragers] - 1
+        )
+        self.alive &= ~(self.is_warrior & (self.lifespan == 0))
@@ -0,0 +1,111 @@
+import numpy as np
+from marker import LIFETIME, MarkerPurpose
+
+RESOLUTION = 5  # Side of a cell of the field
+THRESHOLD = 0.01  # Intensity under which a cell is considered empty
+DECAY = THRESHOLD ** (1 / LIFETIME)  # A single deposit fades out after LIFETIME steps
+N_SENSORS = 8  # Directions in which ants sense the field
+
+
+class PheromoneField:
+    """
+    Markers of every colony stored as intensities over a grid covering the
+    space, one layer per colony and per ``MarkerPurpose``.
+
+    Depositing and sensing only touch a few cells and evaporation is a
+    single array operation, so the cost of markers doesn't depend on the
+    number of markers left since the beginning of the run.
+    """
+
+    def __init__(self, width, height, n_colonies, resolution=RESOLUTION, decay=DECAY):
+        self.width = width
+        self.height = height
+        self.resolution = resolution
+        self.decay = decay
+        self.values = np.zeros(
+            (
+                n_colonies,
+                len(MarkerPurpose),
+                int(np.ceil(height / resolution)),
+                int(np.ceil(width / resolution)),
+            ),
+            dtype=np.float32,
+        )
+
+    def cells(self, x, y):
+        """
+        Row and column of the cells of ``(x, y)``, and whether they are inside the field.
+        """
+        row = np.floor(np.asarray(y) / self.resolution).astype(np.int64)
+        col = np.floor(np.asarray(x) / self.resolution).astype(np.int64)
+        inside = (
+            (row >= 0)
+            & (row < self.values.shape[2])
+            & (col >= 0)
+            & (col < self.values.shape[3])
+        )
+        return row, col, inside
+
+    def deposit(self, colony_id, purpose, x, y, amount=1.0):
+        """
+        Add ``amount`` at the positions ``(x, y)``, ``colony_id`` and
+        ``x``, ``y`` can be arrays to deposit many markers at once.
+        """
+        row, col, inside = self.cells(x, y)
+        colony_id = np.broadcast_to(colony_id, inside.shape)
+        layer = purpose.value - 1
+        np.add.at(
+            self.values,
+            (colony_id[inside], layer, row[inside], col[inside]),
+            amount,
+        )
+
+    def evaporate(self):
+        self.values *= self.decay
+        self.values[self.values < THRESHOLD] = 0
+
+    def sense(self, colony_id, purpose, x, y, radius, towards=None):
+        """
+        Positions of the strongest cells sensed by ants at ``(x, y)``.
+
+        Each ant samples the field in ``N_SENSORS`` directions at half and
+        full ``radius``; ``nan`` is returned for ants sensing nothing. With
+        ``towards``, only points on the side of that position are kept.
+        """
+        x, y = np.atleast_1d(np.asarray(x, dtype=float)), np.atleast_1d(
+            np.asarray(y, dtype=float)
+        )
+        colony_id = np.broadcast_to(colony_id, x.shape)
+        directions = np.arange(N_SENSORS) * 2 * np.pi / N_SENSORS
+        reach = np.broadcast_to(radius, x.shape)[:, None] * np.repeat(
+            [0.5, 1], N_SENSORS
+        )
+        directions = np.tile(directions, 2)
+        sx = x[:, None] + reach * np.cos(directions)
+        sy = y[:, None] + reach * np.sin(directions)
+
+        row, col, inside = self.cells(sx, sy)
+        values = np.zeros(sx.shape, dtype=self.values.dtype)
+        values[inside] = self.values[
+            np.broadcast_to(colony_id[:, None], sx.shape)[inside],
+            purpose.value - 1,
+            row[inside],
+            col[inside],
+        ]
+        if towards is not None:
+            ax, ay = towards
+            values[
+                (x[:, None] - ax) * (x[:, None] - sx)
+                + (y[:, None] - ay) * (y[:, None] - sy)
+                <= 0
+            ] = 0
+
+        best = values.argmax(axis=1)
+        found = values[np.arange(len(x)), best] > 0
+        return (
+            np.where(found, sx[np.arange(len(x)), best], np.nan),
+            np.where(found, sy[np.arange(len(x)), best], np.nan),
+        )
+
+    def count(self, colony_id, purpose):
+        return int(np.count_nonzero(self.values[colony_id, purpose.value - 1]))
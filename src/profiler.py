@@ -0,0 +1,169 @@
+import functools
+import time
+
+import pandas as pd
+
+# Phases of Ground.step, in order, then the methods of the agents timed by Profiler.instrument
+STEP_PHASES = (
+    "engine",
+    "agents",
+    "marker aging",
+    "food removal",
+    "death removal",
+    "collection",
+    "stop check",
+)
+AGENT_PHASES = (
+    "Ant.step",
+    "Ant.neighbors",
+    "Ant.avoid_crash",
+    "Ant.look_for_food",
+    "Ant.look_for_food_marker",
+    "Warrior.step",
+    "Warrior.avoid_crash",
+    "Warrior.look_for_ant",
+)
+COUNTERS = (
+    "collision retries",
+    "collision failures",
+    "neighbor candidates",
+    "food found",
+    "food markers found",
+    "enemies found",
+    "markers created",
+    "markers expired",
+)
+
+
+def found(result):
+    return result is not None
+
+
+class Profiler:
+    """
+    Time spent in each phase of a step and counters of what happened in
+    them, both for the current step and since the beginning of the run.
+
+    A model without profiler is not instrumented at all: ``Ground`` only
+    checks for one once per phase of its step, the methods of the agents
+    being wrapped by ``instrument`` when profiling.
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.times = dict.fromkeys(STEP_PHASES + AGENT_PHASES, 0.0)
+        self.calls = dict.fromkeys(STEP_PHASES + AGENT_PHASES, 0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.step_times = dict(self.times)
+        self.step_counters = dict(self.counters)
+
+    def begin_step(self):
+        self.steps += 1
+        self.step_times = dict.fromkeys(self.times, 0.0)
+        self.step_counters = dict.fromkeys(self.counters, 0)
+
+    def add(self, phase, seconds):
+        self.times[phase] = self.times.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        self.step_times[phase] = self.step_times.get(phase, 0.0) + seconds
+
+    def lap(self, phase, start):
+        """
+        Add the time since ``start`` to ``phase`` and return the current time,
+        the start of the next phase.
+        """
+        now = time.perf_counter()
+        self.add(phase, now - start)
+        return now
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+        self.step_counters[counter] = self.step_counters.get(counter, 0) + n
+
+    def timed(self, phase, method, counter=None, measure=len):
+        """
+        ``method`` adding its duration to ``phase`` and, with ``counter``,
+        ``measure`` of its result to ``counter``.
+        """
+
+        @functools.wraps(method)
+        def timed_method(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            self.add(phase, time.perf_counter() - start)
+            if counter is not None:
+                self.count(counter, int(measure(result)))
+            return result
+
+        return timed_method
+
+    def instrument(self, agent):
+        """
+        Wrap the methods of ``agent`` (an ``Ant`` or a ``Warrior``) timed by
+        the profiler, on the agent only.
+        """
+        kind = type(agent).__name__
+        methods = {
+            "step": (None, None),
+            "avoid_crash": (None, None),
+        }
+        if kind == "Warrior":
+            methods["look_for_ant"] = ("enemies found", found)
+        else:
+            methods["neighbors"] = ("neighbor candidates", len)
+            methods["look_for_food"] = ("food found", found)
+            methods["look_for_food_marker"] = ("food markers found", found)
+        for name, (counter, measure) in methods.items():
+            setattr(
+                agent,
+                name,
+                self.timed(
+                    f"{kind}.{name}", getattr(agent, name), counter, measure or len
+                ),
+            )
+
+    def reporters(self):
+        """
+        Model reporters of the time of each phase and of each counter during
+        the last step.
+        """
+        reporters = {}
+        for phase in STEP_PHASES + AGENT_PHASES:
+            reporters["Time " + phase] = functools.partial(
+                lambda model, phase: model.profiler.step_times[phase], phase=phase
+            )
+        for counter in COUNTERS:
+            reporters[counter.capitalize()] = functools.partial(
+                lambda model, counter: model.profiler.step_counters[counter],
+                counter=counter,
+            )
+        return reporters
+
+    def summary(self):
+        """
+        Table of the phases (calls, total and mean time, share of the steps)
+        and of the counters (total and mean per step).
+        """
+        step_time = sum(self.times[phase] for phase in STEP_PHASES)
+        rows = []
+        for phase, seconds in self.times.items():
+            calls = self.calls[phase]
+            rows.append(
+                {
+                    "name": phase,
+                    "calls": calls,
+                    "total": seconds,
+                    "per call (ms)": 1e3 * seconds / calls if calls else 0.0,
+                    "share of steps": seconds / step_time if step_time else 0.0,
+                    "per step": seconds / self.steps if self.steps else 0.0,
+                }
+            )
+        for counter, n in self.counters.items():
+            rows.append(
+                {
+                    "name": counter,
+                    "total": n,
+                    "per step": n / self.steps if self.steps else 0.0,
+                }
+            )
+        return pd.DataFrame(rows).set_index("name")
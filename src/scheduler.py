@@ -0,0 +1,99 @@
+from mesa.time import RandomActivation
+
+
+class DeferredRandomActivation(RandomActivation):
+    """
+    ``RandomActivation`` whose agents die during a step: ``kill`` only
+    queues their death, so that removing an agent doesn't touch the
+    structures being iterated, and ``remove_dead`` removes all of them at
+    once at the end of the step. An agent killed during a step is not
+    activated for the rest of it.
+    """
+
+    def __init__(self, model):
+        super().__init__(model)
+        self.dead = {}
+
+    def kill(self, agent):
+        self.dead[agent.unique_id] = agent
+
+    def is_alive(self, agent):
+        return agent.unique_id not in self.dead
+
+    def agent_buffer(self, shuffled=False):
+        agent_keys = list(self._agents.keys())
+        if shuffled:
+            self.model.random.shuffle(agent_keys)
+
+        for key in agent_keys:
+            if key in self._agents and key not in self.dead:
+                yield self._agents[key]
+
+    def remove_dead(self):
+        """
+        Remove the agents killed since the last call and return them.
+        """
+        dead = list(self.dead.values())
+        for agent in dead:
+            del self._agents[agent.unique_id]
+        self.dead.clear()
+        return dead
+
+
+class StagedRandomActivation(DeferredRandomActivation):
+    """
+    Agents activated stage by stage, in the order of ``stages``, the random
+    order only being within each stage. ``stage_of(agent)`` is the stage of
+    an agent and ``partition_of(agent)`` its partition within the stage (its
+    colony), ``partition`` giving the agents of one of them.
+    """
+
+    def __init__(self, model, stages, stage_of, partition_of):
+        super().__init__(model)
+        self.stages = tuple(stages)
+        self.stage_of = stage_of
+        self.partition_of = partition_of
+        self.partitions = {stage: {} for stage in self.stages}
+
+    def add(self, agent):
+        super().add(agent)
+        stage = self.partitions[self.stage_of(agent)]
+        stage.setdefault(self.partition_of(agent), {})[agent.unique_id] = agent
+
+    def remove(self, agent):
+        super().remove(agent)
+        self.forget(agent)
+
+    def forget(self, agent):
+        del self.partitions[self.stage_of(agent)][self.partition_of(agent)][
+            agent.unique_id
+        ]
+
+    def partition(self, stage, key):
+        return self.partitions[stage].get(key, {})
+
+    def stage_buffer(self, stage):
+        """
+        The living agents of ``stage``, partition after partition then
+        shuffled.
+        """
+        partitions = self.partitions[stage]
+        agent_keys = [key for part in sorted(partitions) for key in partitions[part]]
+        self.model.random.shuffle(agent_keys)
+
+        for key in agent_keys:
+            if key in self._agents and key not in self.dead:
+                yield self._agents[key]
+
+    def step(self):
+        for stage in self.stages:
+            for agent in self.stage_buffer(stage):
+                agent.step()
+        self.steps += 1
+        self.time += 1
+
+    def remove_dead(self):
+        dead = super().remove_dead()
+        for agent in dead:
+            self.forget(agent)
+        return dead
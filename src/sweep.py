@@ -0,0 +1,112 @@
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import to_json
+from environnement import Ground
+
+MAX_STEPS = 1000  # Same default as mesa's BatchRunner
+
+
+def parameter_grid(variable_parameters):
+    """
+    Every combination of ``variable_parameters``, in the order of mesa's
+    BatchRunner.
+    """
+    names = list(variable_parameters.keys())
+    for values in itertools.product(*variable_parameters.values()):
+        yield dict(zip(names, values))
+
+
+def point_seed(base, params, iteration):
+    """
+    Seed of the ``iteration``-th run of ``params`` in a sweep seeded by the
+    ``SeedSequence`` ``base``. It doesn't depend on the other points, so
+    that a point keeps its seed (and its cached result) when a sweep is
+    extended.
+    """
+    digest = hashlib.sha256(to_json(params).encode()).digest()
+    key = (int.from_bytes(digest[:8], "little"), iteration)
+    return int(np.random.SeedSequence(base.entropy, spawn_key=key).generate_state(1)[0])
+
+
+def run_point(job):
+    """
+    Run one ``Ground`` until it stops and return its parameters, its run
+    number, when and why it stopped and the final values of its model
+    reporters. ``max_steps`` bounds the run unless the parameters set it.
+    """
+    run, params, seed, max_steps = job
+    model = Ground(**dict({"max_steps": max_steps}, **params), seed=seed)
+    while model.running:
+        model.step()
+
+    record = dict(params, Run=run)
+    record["Steps"] = model.schedule.steps
+    record["Stop reason"] = model.stop_reason
+    for name, reporter in model.datacollector.model_reporters.items():
+        record[name] = reporter(model)
+    return record
+
+
+def run_sweep(
+    variable_parameters,
+    iterations=1,
+    max_steps=MAX_STEPS,
+    workers=1,
+    seed=None,
+    cache=None,
+):
+    """
+    Run every combination of ``variable_parameters`` ``iterations`` times, on
+    a pool of ``workers`` processes (in this process if ``workers`` is 1).
+    With a ``ResultCache``, only the runs it doesn't hold are executed.
+
+    Each run gets its own seed derived from ``seed``, its parameters and its
+    iteration (see ``point_seed``), so that results are reproducible and
+    don't depend on the number of workers. The DataFrame has the same columns as
+    ``BatchRunner.get_model_vars_dataframe``: the parameters, ``Run`` and
+    the reporters.
+    """
+    base = np.random.SeedSequence(seed)
+    points = [
+        (params, point_seed(base, params, iteration))
+        for params in parameter_grid(variable_parameters)
+        for iteration in range(iterations)
+    ]
+    jobs = [
+        (run, params, run_seed, max_steps)
+        for run, (params, run_seed) in enumerate(points)
+    ]
+
+    records = [None] * len(jobs)
+    keys = [None] * len(jobs)
+    if cache is not None:
+        for run, params, run_seed, _ in jobs:
+            keys[run] = cache.key(dict({"max_steps": max_steps}, **params), run_seed)
+            result = cache.get(keys[run])
+            if result is not None:
+                records[run] = dict(params, Run=run, **result)
+    missing = [job for job in jobs if records[job[0]] is None]
+
+    if workers == 1:
+        results = [run_point(job) for job in missing]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_point, missing, chunksize=1))
+    for (run, params, _, _), record in zip(missing, results):
+        records[run] = record
+        if cache is not None:
+            # Only the outcome is cached, the parameters being those of the sweep
+            cache.put(
+                keys[run],
+                {k: v for k, v in record.items() if k not in params and k != "Run"},
+            )
+
+    df = pd.DataFrame(records)
+    index_cols = list(variable_parameters.keys()) + ["Run"]
+    rest_cols = sorted(set(df.columns) - set(index_cols))
+    return df[index_cols + rest_cols]
@@ -0,0 +1,162 @@
+import json
+import os
+
+import numpy as np
+
+# Fixed-width record of one agent at one recorded tick, positions of dead agents being NaN
+RECORD = np.dtype(
+    [
+        ("x", np.float32),
+        ("y", np.float32),
+        ("angle", np.float32),
+        ("carrying", np.bool_),
+        ("alive", np.bool_),
+    ]
+)
+CHUNK_BYTES = 64 * 2**20  # By how much the file grows when full
+
+
+def header_path(path):
+    return f"{path}.json"
+
+
+def agent_states(model, uids):
+    """
+    Records of the agents ``uids`` of ``model`` (which must be those of
+    ``model.engine`` when it has one) at the current tick.
+    """
+    states = np.zeros(len(uids), dtype=RECORD)
+    engine = model.engine
+    if engine is not None:
+        states["x"], states["y"] = engine.x, engine.y
+        states["angle"] = engine.angle
+        states["carrying"] = engine.is_carrying
+        states["alive"] = engine.alive
+    else:
+        agents = list(model.schedule.agents)
+        columns = np.searchsorted(uids, [agent.unique_id for agent in agents])
+        states["x"][columns] = [agent.x for agent in agents]
+        states["y"][columns] = [agent.y for agent in agents]
+        states["angle"][columns] = [agent.angle for agent in agents]
+        states["carrying"][columns] = [agent.is_carrying for agent in agents]
+        states["alive"][columns] = True
+    alive = states["alive"]
+    for name in ("x", "y", "angle"):
+        states[name][~alive] = np.nan
+    return states
+
+
+class TrajectoryRecorder:
+    """
+    States of the agents ``uids`` (sorted) written every ``stride`` steps
+    to the file ``path``, one row of ``RECORD`` per recorded tick and one
+    column per agent. The file is memory-mapped and grown ``CHUNK_BYTES`` at
+    a time, so that the memory used doesn't grow with the run.
+
+    The agents, the stride and the number of recorded ticks are written to
+    ``path.json`` by ``flush``, so that ``Trajectories`` can read the file.
+    """
+
+    def __init__(self, path, uids, stride=1, chunk_bytes=CHUNK_BYTES):
+        self.path = str(path)
+        self.uids = np.asarray(uids, dtype=np.int64)
+        self.stride = stride
+        self.chunk_ticks = max(1, chunk_bytes // (RECORD.itemsize * max(1, len(uids))))
+        self.first = None
+        self.ticks = 0
+        self.capacity = 0
+        self.records = None
+        open(self.path, "wb").close()
+
+    def grow(self):
+        if self.records is not None:
+            self.records.flush()
+            self.records = None
+        self.capacity += self.chunk_ticks
+        os.truncate(self.path, self.capacity * len(self.uids) * RECORD.itemsize)
+        self.records = np.memmap(
+            self.path, dtype=RECORD, mode="r+", shape=(self.capacity, len(self.uids))
+        )
+        self.flush()
+
+    def record(self, model):
+        """
+        Write the states of the agents of ``model`` if its current step is
+        a multiple of the stride.
+        """
+        step = model.schedule.steps
+        if step % self.stride != 0:
+            return
+        if self.ticks == self.capacity:
+            self.grow()
+        if self.first is None:
+            self.first = step
+        self.records[self.ticks] = agent_states(model, self.uids)
+        self.ticks += 1
+
+    def flush(self):
+        if self.records is not None:
+            self.records.flush()
+        header = {
+            "agents": self.uids.tolist(),
+            "stride": self.stride,
+            "first": self.first,
+            "ticks": self.ticks,
+        }
+        with open(header_path(self.path), "w") as f:
+            json.dump(header, f)
+
+    def close(self):
+        # The file is cut to the recorded ticks
+        self.flush()
+        self.records = None
+        os.truncate(self.path, self.ticks * len(self.uids) * RECORD.itemsize)
+
+
+class Trajectories:
+    """
+    Read only view of a file written by ``TrajectoryRecorder``: ``records``
+    is a ``(ticks, agents)`` array of ``RECORD`` mapped from the file, of
+    which ``tick`` and ``agent`` return views without copying anything.
+    """
+
+    def __init__(self, path):
+        with open(header_path(path)) as f:
+            header = json.load(f)
+        self.uids = np.array(header["agents"], dtype=np.int64)
+        self.stride = header["stride"]
+        first = header["first"] or 0
+        self.steps = first + self.stride * np.arange(header["ticks"])
+        shape = (header["ticks"], len(self.uids))
+        self.records = (
+            np.memmap(path, dtype=RECORD, mode="r", shape=shape)
+            if header["ticks"] and len(self.uids)
+            else np.zeros(shape, dtype=RECORD)
+        )
+
+    def __len__(self):
+        return len(self.steps)
+
+    def tick(self, step):
+        """
+        Records of every agent at ``step``, which must have been recorded.
+        """
+        i = int(np.searchsorted(self.steps, step))
+        if i == len(self.steps) or self.steps[i] != step:
+            raise KeyError(f"step {step} was not recorded")
+        return self.records[i]
+
+    def agent(self, uid):
+        """
+        Records of the agent ``uid`` at every recorded tick.
+        """
+        j = int(np.searchsorted(self.uids, uid))
+        if j == len(self.uids) or self.uids[j] != uid:
+            raise KeyError(f"agent {uid} was not recorded")
+        return self.records[:, j]
+
+    def column(self, name):
+        """
+        ``(ticks, agents)`` view of the field ``name`` of the records.
+        """
+        return self.records[name]
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The simulation modules import each other as top-level modules (``from ant import Ant``)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
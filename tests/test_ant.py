@@ -4,15 +4,25 @@ import uuid
 from src import ant, space, environnement
 
 MODEL = environnement.Ground(
-    n_colony=2,
-    n_ants_per_colony=[2, 2],
-    color_ants="black",
-    color_food="blue",
+    n_colonies=2,
+    n_ants=[2, 2],
+    n_warriors=[0, 0],
     n_obstacles=5,
-    n_food=2,
+    n_foods=2,
+    color_food="blue",
+    epsilons=[0.5, 0.5],
     speed=20,
+    seed=0,
+)
+COLONY = environnement.Colony(
+    x=0,
+    y=0,
+    r=10,
+    color_colony="purple",
+    id_colony=0,
+    markers_colors=MODEL.marker_colors,
+    epsilon=0.5,
 )
-COLONY = environnement.Colony(x=0, y=0, r=10, ants=10, color_colony="purple")
 
 
 def test_create_ant():
@@ -26,6 +36,7 @@ def test_create_ant():
         colony=COLONY,
         color="black",
         sight_distance=20,
+        epsilon=0.5,
         proba_cgt_angle=0.5,
     )
 
@@ -42,14 +53,13 @@ def test_go_to_reachable():
         colony=COLONY,
         color="black",
         sight_distance=20,
+        epsilon=0.5,
         proba_cgt_angle=0.5,
     )
     next_x, next_y = 7.0, 2.0
     reached = True
 
-    (predicted_x, predicted_y), predicted_angle, predicted_reach = test_ant.go_to(
-        target
-    )
+    predicted_x, predicted_y, predicted_angle, predicted_reach = test_ant.go_to(target)
 
     assert next_x == predicted_x
     assert next_y == predicted_y
@@ -68,15 +78,14 @@ def test_go_to_not_reachable():
         colony=COLONY,
         color="black",
         sight_distance=20,
+        epsilon=0.5,
         proba_cgt_angle=0.5,
     )
     next_x, next_y = 10.0, 0.0
     next_angle = 0.1973
     reached = False
 
-    (predicted_x, predicted_y), predicted_angle, predicted_reach = test_ant.go_to(
-        target
-    )
+    predicted_x, predicted_y, predicted_angle, predicted_reach = test_ant.go_to(target)
 
     assert next_x == predicted_x
     assert next_y == predicted_y
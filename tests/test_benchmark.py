@@ -0,0 +1,37 @@
+from benchmark import compare, run_benchmarks
+
+GRID = {"n_ants": (5,), "n_warriors": (1,), "n_obstacles": (2,), "markers": (10,)}
+
+
+def test_run_benchmarks_records():
+    results = run_benchmarks(GRID, engines=("agents", "vectorized"), steps=1, repeat=1)
+
+    names = [result["name"] for result in results["results"]]
+    assert names.count("Ground.step") == 2
+    assert {
+        "Ant.step",
+        "Warrior.step",
+        "Ant.avoid_crash",
+        "ContinuousCanvas.render",
+    } <= set(names)
+    assert all(result["seconds"] > 0 for result in results["results"])
+
+
+def test_compare_flags_regressions():
+    def results(seconds):
+        return {
+            "results": [
+                {"name": name, "params": {"n_ants": 5}, "seconds": s}
+                for name, s in seconds.items()
+            ]
+        }
+
+    baseline = results({"Ground.step": 1.0, "Ant.step": 1.0, "Gone": 1.0})
+    current = results({"Ground.step": 1.1, "Ant.step": 2.0, "New": 1.0})
+
+    ratios, regressions = compare(current, baseline, threshold=1.2)
+    assert [(r["name"], ratio) for r, ratio in ratios] == [
+        ("Ground.step", 1.1),
+        ("Ant.step", 2.0),
+    ]
+    assert [r["name"] for r, _ in regressions] == ["Ant.step"]
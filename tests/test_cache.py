@@ -0,0 +1,40 @@
+import os
+
+from cache import ResultCache
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=(5, 5),
+    n_warriors=(1, 0),
+    n_obstacles=3,
+    n_foods=2,
+    color_food="#EAEA08",
+    epsilons=(0.5, 0.5),
+    speed=20,
+)
+
+
+def test_keys_include_defaults_and_seed(tmp_path):
+    cache = ResultCache(tmp_path)
+    key = cache.key(PARAMS, 1)
+    assert cache.key(dict(PARAMS, engine="agents"), 1) == key
+    assert cache.key(dict(PARAMS, n_ants=[5, 5]), 1) == key
+    assert cache.key(dict(PARAMS, engine="vectorized"), 1) != key
+    assert cache.key(PARAMS, 2) != key
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path)
+    for i in range(3):
+        cache.put(f"k{i}", {"Steps": i})
+        # Distinct times of use, whatever the resolution of the file system
+        os.utime(cache.file(f"k{i}"), ns=(i * 10**9, i * 10**9))
+    assert cache.get("k0") == {"Steps": 0}
+
+    size = cache.file("k0").stat().st_size
+    cache.max_bytes = 3 * size
+    cache.put("k3", {"Steps": 3})
+    assert len(cache) == 3
+    assert cache.get("k1") is None
+    assert cache.get("k0") == {"Steps": 0}
+    assert cache.get("missing") is None
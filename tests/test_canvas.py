@@ -0,0 +1,97 @@
+import base64
+
+import numpy as np
+
+from canvas import HEATMAP_SATURATION, ContinuousCanvas
+from environnement import Ground
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 7],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.3],
+    speed=15,
+)
+
+
+def test_delta_frames_only_carry_changes():
+    model = Ground(**PARAMS, seed=0)
+    canvas = ContinuousCanvas(delta=True)
+
+    first = canvas.render(model)
+    assert first["full"]
+    assert len(first["static"]) == len(model.obstacles) + len(model.colonies)
+    assert set(first["ants"]) == {a.unique_id for a in model.schedule.agents}
+
+    # Nothing changed since the previous frame
+    again = canvas.render(model)
+    assert not again["full"] and "static" not in again and "foods" not in again
+    assert again["ants"] == {} and again["removed"] == []
+
+    for _ in range(5):
+        model.step()
+    frame = canvas.render(model)
+    markers = model.markers_dict["0"]
+    assert frame["markers"][0]["ids"] == list(
+        range(markers.head + markers.offset, markers.tail + markers.offset)
+    )
+    assert canvas.render(model)["markers"][0]["ids"] == []
+
+    # A reset gives a new model
+    assert canvas.render(Ground(**PARAMS, seed=0))["full"]
+
+
+def test_every_client_gets_a_full_frame_first():
+    model = Ground(**PARAMS, seed=0)
+    canvas = ContinuousCanvas(delta=True)
+    canvas.client = "first tab"
+    assert canvas.render(model)["full"]
+    model.step()
+    assert not canvas.render(model)["full"]
+
+    # Another tab, or the same one reloaded, starts from scratch
+    canvas.client = "second tab"
+    frame = canvas.render(model)
+    assert frame["full"] and "static" in frame
+    canvas.client = "first tab"
+    assert not canvas.render(model)["full"]
+
+    canvas.forget("first tab")
+    assert canvas.render(model)["full"]
+
+
+def test_max_fps_and_marker_stride():
+    model = Ground(**PARAMS, seed=0)
+    for _ in range(5):
+        model.step()
+    canvas = ContinuousCanvas(delta=True, max_fps=1e-3, marker_stride=3)
+
+    frame = canvas.render(model)
+    assert all(i % 3 == 0 for i in frame["markers"][0]["ids"])
+    assert canvas.render(model) == {"skip": True}
+
+
+def test_heatmaps_count_the_markers():
+    model = Ground(**PARAMS, seed=0)
+    for _ in range(10):
+        model.step()
+    canvas = ContinuousCanvas(heatmap=True)
+
+    heatmaps = canvas.heatmaps(model)
+    assert heatmaps and all(p["rows"] * p["cols"] == 100 * 100 for p in heatmaps)
+    representation = canvas.render(model)
+    assert [p for p in representation[2] if p["Shape"] == "circle"] == []
+
+    # A cell holding a single marker is drawn at 255 / HEATMAP_SATURATION
+    for heatmap in heatmaps:
+        alpha = np.frombuffer(base64.b64decode(heatmap["data"]), dtype=np.uint8)
+        assert np.all(alpha[alpha > 0] >= 255 // HEATMAP_SATURATION)
+    n_markers = sum(len(markers) for markers in model.markers_dict.values())
+    n_cells = sum(
+        np.count_nonzero(np.frombuffer(base64.b64decode(heatmap["data"]), np.uint8))
+        for heatmap in heatmaps
+    )
+    assert 0 < n_cells <= n_markers
@@ -0,0 +1,55 @@
+import pytest
+
+from checkpoint import load, save
+from environnement import Ground
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 7],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.3],
+    speed=15,
+)
+
+
+def snapshot(model):
+    if model.engine is not None:
+        agents = (model.engine.x.tolist(), model.engine.y.tolist())
+    else:
+        agents = [(a.unique_id, a.x, a.y, a.angle) for a in model.schedule.agents]
+    return (
+        agents,
+        [(f.x, f.y, f.stock) for f in model.foods],
+        [(c.food_picked, len(c.ants), len(c.warriors)) for c in model.colonies],
+        [len(markers) for markers in model.markers_dict.values()],
+        model.datacollector.get_model_vars_dataframe().values.tolist(),
+    )
+
+
+@pytest.mark.parametrize(
+    "engine, markers, stages",
+    [
+        ("agents", "objects", None),
+        ("vectorized", "field", None),
+        ("agents", "objects", ["warriors", "foragers"]),
+        ("kernel", "objects", None),
+        ("parallel", "objects", None),
+    ],
+)
+def test_resumed_run_is_identical(tmp_path, engine, markers, stages):
+    model = Ground(**PARAMS, engine=engine, markers=markers, seed=4, stages=stages)
+    for _ in range(20):
+        model.step()
+    save(model, tmp_path / "checkpoint.npz", compress=True)
+    for _ in range(20):
+        model.step()
+
+    resumed = load(tmp_path / "checkpoint.npz")
+    assert resumed.schedule.steps == 20
+    for _ in range(20):
+        resumed.step()
+
+    assert snapshot(resumed) == snapshot(model)
@@ -0,0 +1,61 @@
+import math
+import types
+
+import numpy as np
+
+from ant import Ant
+from collision import as_objects, choose_angle, crashes, segment_distances
+from space import Point, euclidean, move
+
+
+def test_segment_distances_cases():
+    # Obstacle in front, behind, and beyond the end of the move
+    dist = segment_distances(0, 0, 10, 0, np.array([5, -5, 13]), np.array([2, 0, 4]))
+    assert np.allclose(dist, [2, np.inf, 5])
+
+
+def will_crash_with(ant, obj):
+    """
+    Scalar crash check the ants used before ``crashes``, kept as an oracle.
+    """
+    pf = Point(*move(ant.x, ant.y, ant.speed, ant.angle))
+    norm_p0pf = euclidean(ant, pf)
+    norm_p0pc = euclidean(ant, obj)
+    prod = (pf.x - ant.x) * (obj.x - ant.x) + (pf.y - ant.y) * (obj.y - ant.y)
+    norm_p0ph = abs(prod / norm_p0pf)
+
+    if norm_p0ph > norm_p0pf:
+        dist = euclidean(pf, obj)
+    elif prod < 0:
+        dist = np.inf
+    else:
+        dist = math.sqrt(max(norm_p0pc**2 - norm_p0ph**2, 0))
+    return dist <= obj.r
+
+
+def test_crashes_matches_will_crash_with():
+    rng = np.random.default_rng(1)
+    obstacles = [
+        types.SimpleNamespace(x=x, y=y, r=r)
+        for x, y, r in zip(rng.random(20) * 60, rng.random(20) * 60, rng.random(20) * 5)
+    ]
+    ant = Ant(0, None, 30, 30, 10, 0, 80, None, "black", 0.5)
+
+    angles = rng.random(50) * 2 * np.pi
+    crash = crashes(
+        ant.x, ant.y, ant.speed, angles, as_objects(obstacles, lambda o: o.r)
+    )
+
+    for angle, predicted in zip(angles, crash):
+        ant.angle = angle
+        assert predicted == any(will_crash_with(ant, o) for o in obstacles)
+
+
+def test_choose_angle_avoids_obstacle():
+    wall = as_objects([Point(5, 0)], lambda o: 2)
+    rng = np.random.default_rng(0)
+
+    angle = choose_angle(0, 0, 10, 0, rng, obstacles=wall)
+
+    assert not crashes(0, 0, 10, [angle], wall)[0]
+    assert choose_angle(0, 0, 10, np.pi, rng, obstacles=wall) == np.pi
@@ -0,0 +1,109 @@
+import numpy as np
+
+from engine import pairs_within
+from environnement import WIDTH, Ground
+from marker import MarkerPurpose
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 7],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.3],
+    speed=15,
+)
+
+
+def test_pairs_within_matches_brute_force():
+    rng = np.random.default_rng(0)
+    qx, qy = rng.random(50) * 100, rng.random(50) * 100
+    px, py = rng.random(80) * 100, rng.random(80) * 100
+
+    qi, pj = pairs_within(qx, qy, px, py, 15)
+
+    dist = np.hypot(qx[:, None] - px[None], qy[:, None] - py[None])
+    assert set(zip(qi.tolist(), pj.tolist())) == set(zip(*np.nonzero(dist < 15)))
+
+
+def test_vectorized_engine_steps():
+    model = Ground(**PARAMS, engine="vectorized")
+    for _ in range(20):
+        model.step()
+
+    assert not model.schedule.agents
+    assert model.count_ants(0) <= 10 and model.count_ants(1) <= 7
+    assert np.isfinite(model.engine.x).all()
+
+
+def isolated(select):
+    """
+    Vectorized model in which only the agents ``select(engine)`` are alive.
+    """
+    model = Ground(**PARAMS, seed=0, engine="vectorized")
+    engine = model.engine
+    rows = select(engine)
+    engine.alive[:] = False
+    engine.alive[rows] = True
+    return model, engine, rows
+
+
+def count_markers(model, id_colony, purpose):
+    purposes = model.markers_dict[str(id_colony)].live("purpose")
+    return int(np.count_nonzero(purposes == purpose.value))
+
+
+def test_ant_picks_food_and_brings_it_back():
+    model, engine, (ant,) = isolated(lambda e: np.flatnonzero(~e.is_warrior)[:1])
+    food = model.foods[0]
+    stock = food.stock
+    engine.x[ant], engine.y[ant] = food.x, food.y
+    engine.epsilon[ant] = 1
+    colony = model.colonies[engine.colony[ant]]
+
+    model.step()
+    assert engine.is_carrying[ant]
+    assert food.stock == stock - 1
+    assert count_markers(model, colony.id_colony, MarkerPurpose.FOOD) == 1
+
+    engine.x[ant], engine.y[ant] = colony.x, colony.y
+    model.step()
+    assert not engine.is_carrying[ant]
+    assert colony.food_picked == 1
+    assert count_markers(model, colony.id_colony, MarkerPurpose.FOOD) == 2
+
+
+def test_pickups_stop_when_the_stock_runs_out():
+    model, engine, ants = isolated(lambda e: np.flatnonzero(~e.is_warrior)[:3])
+    food = model.foods[0]
+    food.stock = 2
+    engine.x[ants], engine.y[ants] = food.x, food.y
+    engine.epsilon[ants] = 1
+
+    model.step()
+    assert engine.is_carrying[ants].tolist() == [True, True, False]
+    assert food not in model.foods
+
+
+def test_warriors_kill_ants_and_die_at_the_end_of_their_lifespan():
+    def select(engine):
+        prey = np.flatnonzero(~engine.is_warrior & (engine.colony == 0))[:2]
+        warrior = np.flatnonzero(engine.is_warrior & (engine.colony == 1))[:1]
+        return np.r_[prey, warrior]
+
+    model, engine, (prey, other, warrior) = isolated(select)
+    # Out of sight of the warrior
+    engine.x[other] = (engine.x[warrior] + WIDTH / 2) % WIDTH
+    engine.x[prey], engine.y[prey] = engine.x[warrior], engine.y[warrior]
+    engine.lifespan[warrior] = 2
+
+    model.step()
+    assert not engine.alive[prey]
+    assert engine.lifespan[warrior] == 1 and engine.alive[warrior]
+    assert count_markers(model, 0, MarkerPurpose.DANGER) == 1
+
+    engine.x[other], engine.y[other] = engine.x[warrior], engine.y[warrior]
+    model.step()
+    assert not engine.alive[other]
+    assert engine.lifespan[warrior] == 0 and not engine.alive[warrior]
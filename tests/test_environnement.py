@@ -0,0 +1,60 @@
+from environnement import (
+    STOP_MAX_STEPS,
+    STOP_ONE_COLONY_LEFT,
+    STOP_STALLED,
+    Ground,
+)
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 7],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.3],
+    speed=15,
+)
+
+
+def snapshot(model):
+    return (
+        [(a.unique_id, a.x, a.y, a.angle) for a in model.schedule.agents],
+        [(f.x, f.y, f.stock) for f in model.foods],
+        [(c.x, c.y, c.food_picked) for c in model.colonies],
+        model.color_colonies,
+    )
+
+
+def test_same_seed_same_run():
+    runs = []
+    for _ in range(2):
+        model = Ground(**PARAMS, seed=7)
+        for _ in range(30):
+            model.step()
+        runs.append(snapshot(model))
+
+    assert runs[0] == runs[1]
+    assert snapshot(Ground(**PARAMS, seed=8)) != snapshot(Ground(**PARAMS, seed=7))
+
+
+def test_agent_ids_come_from_a_counter():
+    model = Ground(**PARAMS, seed=0)
+    assert sorted(a.unique_id for a in model.schedule.agents) == list(range(1, 25))
+
+
+def test_stopping_criteria():
+    model = Ground(**PARAMS, seed=3, max_steps=5)
+    model.run_model()
+    assert (model.stop_reason, model.stopped_at) == (STOP_MAX_STEPS, 5)
+
+    model = Ground(**PARAMS, seed=3, stall_steps=1)
+    model.run_model()
+    assert model.stop_reason == STOP_STALLED
+    assert model.stopped_at == model.schedule.steps
+
+    model = Ground(
+        **dict(PARAMS, n_ants=[10, 0]), seed=3, stop_when_one_colony_left=True
+    )
+    model.step()
+    assert model.stop_reason == STOP_ONE_COLONY_LEFT and not model.running
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import geometry
+
+
+def test_scalar_paths_match_numpy():
+    rng = np.random.default_rng(0)
+    for x0, y0, x1, y1, speed, angle in rng.random((100, 6)) * 500:
+        assert geometry.distance(x0, y0, x1, y1) == pytest.approx(
+            np.linalg.norm((x1 - x0, y1 - y0))
+        )
+        assert geometry.move(x0, y0, speed, angle) == pytest.approx(
+            (x0 + speed * np.cos(angle), y0 + speed * np.sin(angle))
+        )
+        assert geometry.heading(x0, y0, x1, y1) == pytest.approx(
+            np.arctan2(y1 - y0, x1 - x0)
+        )
+
+
+def test_batch_versions_match_scalar_paths():
+    rng = np.random.default_rng(1)
+    x0, y0, x1, y1, speed, angle = rng.random((6, 50)) * 500
+    np.testing.assert_allclose(
+        geometry.distances(x0[0], y0[0], x1, y1),
+        [geometry.distance(x0[0], y0[0], x, y) for x, y in zip(x1, y1)],
+    )
+    np.testing.assert_allclose(
+        geometry.move_many(x0, y0, speed, angle),
+        np.transpose([geometry.move(*args) for args in zip(x0, y0, speed, angle)]),
+    )
+    np.testing.assert_allclose(
+        geometry.headings(x0, y0, x1, y1),
+        [geometry.heading(*args) for args in zip(x0, y0, x1, y1)],
+    )
+    assert np.isnan(geometry.headings(np.zeros(1), 0, 0, 0)).all()
@@ -0,0 +1,51 @@
+from src import space
+from src.grid import PartitionedGrid, SpatialGrid
+
+
+def brute_force(points, x, y, radius):
+    return {id(p) for p in points if space.euclidean(p, space.Point(x, y)) < radius}
+
+
+def test_query_matches_brute_force():
+    points = [space.Point((i * 37) % 500, (i * 91) % 500) for i in range(200)]
+    grid = SpatialGrid(80)
+    for p in points:
+        grid.add(p)
+
+    for x, y, radius in [(0, 0, 80), (250, 250, 40), (499, 10, 80), (-20, 30, 80)]:
+        assert {id(p) for p in grid.query(x, y, radius)} == brute_force(
+            points, x, y, radius
+        )
+
+
+def test_move_and_remove():
+    grid = SpatialGrid(80)
+    p = space.Point(10, 10)
+    grid.add(p)
+
+    p.x, p.y = 300, 300
+    grid.move(p)
+    assert not list(grid.query(10, 10, 50))
+    assert list(grid.query(300, 300, 1)) == [p]
+
+    grid.remove(p)
+    assert p not in grid
+    assert len(grid) == 0
+
+
+def test_partitioned_query_excludes_a_partition():
+    points = [space.Point((i * 37) % 500, (i * 91) % 500) for i in range(200)]
+    for i, p in enumerate(points):
+        p.colony = i % 3
+    grid = PartitionedGrid(80, lambda p: p.colony)
+    for p in points:
+        grid.add(p)
+    assert len(grid) == 200
+
+    for x, y, radius in [(0, 0, 80), (250, 250, 40), (499, 10, 80)]:
+        assert {id(p) for p in grid.query(x, y, radius)} == brute_force(
+            points, x, y, radius
+        )
+        assert {id(p) for p in grid.query(x, y, radius, exclude=1)} == brute_force(
+            [p for p in points if p.colony != 1], x, y, radius
+        )
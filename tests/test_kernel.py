@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from environnement import Ground
+
+PARAMS = dict(
+    n_colonies=3,
+    n_ants=[15, 12, 10],
+    n_warriors=[4, 6, 3],
+    n_obstacles=15,
+    n_foods=6,
+    color_food="#EAEA08",
+    epsilons=[0.9, 0.5, 0.7],
+    speed=15,
+)
+
+
+def state(model):
+    if model.engine is not None:
+        engine = model.engine
+        agents = {
+            int(engine.uid[i]): (engine.x[i], engine.y[i], engine.angle[i])
+            for i in np.flatnonzero(engine.alive)
+        }
+    else:
+        agents = {a.unique_id: (a.x, a.y, a.angle) for a in model.schedule.agents}
+    return (
+        agents,
+        [(f.x, f.y, f.stock) for f in model.foods],
+        [c.food_picked for c in model.colonies],
+        [
+            (markers.live("x").tolist(), markers.live("purpose").tolist())
+            for markers in model.markers_dict.values()
+        ],
+    )
+
+
+@pytest.mark.parametrize("seed", [0, 3])
+def test_same_trajectories_as_agents(seed):
+    agents = Ground(**PARAMS, seed=seed)
+    kernel = Ground(**PARAMS, seed=seed, engine="kernel")
+    for _ in range(100):
+        agents.step()
+        kernel.step()
+        assert state(kernel) == state(agents)
+    # Fights happened
+    assert len(state(kernel)[0]) < sum(PARAMS["n_ants"]) + sum(PARAMS["n_warriors"])
+
+
+def test_pheromones_are_not_supported():
+    with pytest.raises(ValueError):
+        Ground(**PARAMS, engine="kernel", markers="field")
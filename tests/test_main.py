@@ -0,0 +1,32 @@
+import json
+
+from main import DEFAULT_PARAMS, parse_param, run_headless, run_params
+
+
+def test_run_headless_collects_every_k_steps():
+    model, df, steps_per_sec = run_headless(
+        dict(DEFAULT_PARAMS, seed=0), steps=20, collect_every=5
+    )
+
+    assert model.schedule.steps == 20
+    assert list(df.index) == [5, 10, 15, 20]
+    assert steps_per_sec > 0
+
+    _, df, _ = run_headless(dict(DEFAULT_PARAMS, seed=0), steps=5, collect_every=0)
+    assert df.empty
+
+
+def test_parse_param():
+    assert parse_param("n_ants=[100,100]") == ("n_ants", [100, 100])
+    assert parse_param("engine=vectorized") == ("engine", "vectorized")
+
+
+def test_run_params_keep_the_seed_of_the_config(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"seed": 7, "n_foods": 2}))
+
+    params = run_params(config)
+    assert params["seed"] == 7 and params["n_foods"] == 2
+    assert run_params(config, [("seed", 8)])["seed"] == 8
+    assert run_params(config, [("seed", 8)], seed=9)["seed"] == 9
+    assert "seed" not in run_params()
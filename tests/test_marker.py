@@ -0,0 +1,63 @@
+import sys
+
+from marker import LIFETIME, Marker, MarkerPurpose, MarkerStore
+
+COLORS = ["#00FF00", "#FF0000"]
+
+
+def test_store_expires_markers_after_lifetime():
+    store = MarkerStore(0, COLORS, capacity=2)
+    store.append(0, 0, MarkerPurpose.FOOD)
+    store.expire()
+    store.extend([1, 2], [0, 0], MarkerPurpose.DANGER, [0, 0])
+
+    # Like the former per-marker countdown, a marker is dropped at the end of its LIFETIME-th step
+    for _ in range(LIFETIME - 1):
+        store.expire()
+    assert len(store) == 3
+    assert store.get(0).x == 0 and store.get(0).lifetime == 0
+
+    store.expire()
+    assert len(store) == 2
+    assert [m.x for m in store] == [1, 2]
+    assert [m.color for m in store] == [COLORS[1]] * 2
+
+    store.expire()
+    assert len(store) == 0
+
+
+def test_store_nearest():
+    store = MarkerStore(0, COLORS)
+    store.extend([10, 20, 30], [0, 0, 0], MarkerPurpose.FOOD, [0, 0, 0])
+    store.append(24, 0, MarkerPurpose.DANGER)
+
+    assert store.nearest(24, 0, MarkerPurpose.FOOD) == 1
+    assert store.nearest(24, 0, MarkerPurpose.DANGER) == 3
+    # Only the markers on the side of a colony at (100, 0)
+    assert store.nearest(24, 0, MarkerPurpose.FOOD, towards=(100, 0)) == 2
+
+
+def test_store_is_smaller_than_marker_objects():
+    store = MarkerStore(0, COLORS)
+    n = 10000
+    store.extend(range(n), range(n), MarkerPurpose.FOOD, [0] * n)
+
+    marker = Marker(0, 0, 0, MarkerPurpose.FOOD, 0, COLORS[0])
+    assert store.nbytes < n * sys.getsizeof(marker)
+
+
+def test_store_index_sees_markers_appended_and_expired():
+    store = MarkerStore(0, COLORS)
+    store.append(10, 0, MarkerPurpose.FOOD)
+    assert store.nearest(0, 0, MarkerPurpose.FOOD) == 0
+
+    # Appended during the same step, after the KD-tree was built
+    store.append(5, 0, MarkerPurpose.FOOD)
+    assert store.nearest(0, 0, MarkerPurpose.FOOD) == 1
+    rows, xs, _ = store.nearest_many([0, 9], [0, 0], MarkerPurpose.FOOD)
+    assert rows.tolist() == [1, 0] and xs.tolist() == [5, 10]
+
+    for _ in range(LIFETIME + 1):
+        store.expire()
+    assert store.nearest(0, 0, MarkerPurpose.FOOD) == -1
+    assert store.nearest_many([0], [0], MarkerPurpose.FOOD)[0].tolist() == [-1]
@@ -0,0 +1,71 @@
+import types
+
+import numpy as np
+import pytest
+
+from metrics import ColumnBuffer, Collector, ParquetSink
+
+
+def model_at(step, value):
+    return types.SimpleNamespace(
+        schedule=types.SimpleNamespace(steps=step), value=value
+    )
+
+
+def run(collector, values):
+    for step, value in enumerate(values, start=1):
+        collector.collect(model_at(step, value))
+    collector.close(model_at(len(values), values[-1]))
+    return collector.get_model_vars_dataframe()
+
+
+def test_column_buffer_grows():
+    buffer = ColumnBuffer(["a", "b"], capacity=2)
+    for i in range(5):
+        buffer.append({"a": i, "b": i / 2})
+
+    assert buffer.column("a").tolist() == [0, 1, 2, 3, 4]
+    assert buffer.column("a").dtype == np.int64
+    assert buffer.column("b").dtype == np.float64
+
+
+@pytest.mark.parametrize(
+    "policy, every, steps",
+    [
+        ("every", 1, [1, 2, 3, 4, 5, 6]),
+        ("every", 4, [4]),
+        ("every", 0, []),
+        ("on_change", 1, [1, 3, 6]),
+        ("end", 1, [6]),
+    ],
+)
+def test_policies(policy, every, steps):
+    reporters = {"Value": lambda model: model.value}
+    df = run(Collector(reporters, policy=policy, every=every), [0, 0, 1, 1, 1, 2])
+
+    assert df.index.tolist() == steps
+
+
+def test_model_vars_latest_value():
+    collector = Collector({"Value": lambda model: model.value})
+    assert collector.model_vars["Value"] == []
+    collector.collect(model_at(1, 3))
+    collector.collect(model_at(2, 5))
+
+    assert collector.model_vars["Value"] == [5]
+    assert type(collector.model_vars["Value"][-1]) is int
+
+
+def test_parquet_sink(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "metrics.parquet"
+    sink = ParquetSink(path, ["Step", "Value"], chunk_rows=4)
+    collector = Collector({"Value": lambda model: model.value}, sink=sink)
+
+    df = run(collector, list(range(10)))
+
+    assert df["Value"].tolist() == list(range(10))
+    # Rows appended later would overwrite the file
+    with pytest.raises(ValueError):
+        sink.append({"Step": 11, "Value": 0})
+    assert collector.get_model_vars_dataframe()["Value"].tolist() == list(range(10))
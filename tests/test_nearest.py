@@ -0,0 +1,38 @@
+import numpy as np
+
+import nearest
+from nearest import NearestIndex
+
+
+def brute_force(xs, ys, x, y, radius, mask):
+    dist = np.where(
+        mask & (np.hypot(xs - x, ys - y) < radius), np.hypot(xs - x, ys - y), np.inf
+    )
+    return int(np.argmin(dist)) if np.isfinite(dist.min()) else -1
+
+
+def test_nearest_within_matches_brute_force(monkeypatch):
+    rng = np.random.default_rng(0)
+    xs, ys = rng.random(300) * 500, rng.random(300) * 500
+    queries = rng.random((30, 2)) * 500
+
+    for tree in (True, False):
+        if not tree:
+            monkeypatch.setattr(nearest, "cKDTree", None)
+        index = NearestIndex(xs, ys)
+        for x, y in queries:
+            # Only the points above the query, like the half-plane filter of markers
+            def predicate(i):
+                return ys[i] > y
+
+            assert index.nearest_within(x, y, 80)[0] == brute_force(
+                xs, ys, x, y, 80, np.ones(300, dtype=bool)
+            )
+            assert index.nearest_within(x, y, np.inf, predicate)[0] == brute_force(
+                xs, ys, x, y, np.inf, ys > y
+            )
+
+        idx, _ = index.nearest_many(queries[:, 0], queries[:, 1], 30)
+        assert idx.tolist() == [
+            brute_force(xs, ys, x, y, 30, np.ones(300, dtype=bool)) for x, y in queries
+        ]
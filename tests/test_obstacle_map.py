@@ -0,0 +1,56 @@
+import types
+
+import numpy as np
+
+from collision import as_objects, choose_angle, crashes
+from geometry import move
+from obstacle_map import ObstacleMap
+
+
+def obstacles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        types.SimpleNamespace(x=x, y=y, r=r)
+        for x, y, r in zip(
+            rng.random(n) * 100, rng.random(n) * 100, 2 + rng.random(n) * 8
+        )
+    ]
+
+
+def test_distance_is_signed_distance_to_nearest_obstacle():
+    objs = obstacles(10)
+    obstacle_map = ObstacleMap(objs, 100, 100)
+    xs, ys = np.random.default_rng(1).random((2, 200)) * 100
+
+    exact = np.min([np.hypot(o.x - xs, o.y - ys) - o.r for o in objs], axis=0)
+    assert np.all(np.abs(obstacle_map.distance(xs, ys) - exact) <= np.sqrt(0.5))
+    assert np.isinf(ObstacleMap([], 100, 100).distance(50, 50))
+
+
+def test_crashes_agree_with_segment_distances_away_from_borders():
+    objs = obstacles(10)
+    obstacle_map = ObstacleMap(objs, 100, 100)
+    rng = np.random.default_rng(2)
+    x, y = 50.0, 50.0
+    angles = rng.random(500) * 2 * np.pi
+
+    exact = crashes(x, y, 10, angles, as_objects(objs, lambda o: o.r))
+    # Grazing moves may go either way, check the others
+    inner = crashes(x, y, 10, angles, as_objects(objs, lambda o: o.r - 1))
+    outer = crashes(x, y, 10, angles, as_objects(objs, lambda o: o.r + 1))
+    clear = inner == outer
+    assert clear.sum() > 400
+    assert np.array_equal(obstacle_map.crashes(x, y, 10, angles)[clear], exact[clear])
+
+
+def test_ant_inside_an_obstacle_can_get_out():
+    obstacle_map = ObstacleMap([types.SimpleNamespace(x=50, y=50, r=20)], 100, 100)
+    # Moving away from the center is allowed, moving deeper is not
+    assert obstacle_map.crashes(55, 50, 5, [0, np.pi]).tolist() == [False, True]
+
+    rng = np.random.default_rng(0)
+    x, y, angle = 52.0, 50.0, np.pi
+    for _ in range(20):
+        angle = choose_angle(x, y, 5, angle, rng, obstacle_map=obstacle_map)
+        x, y = move(x, y, 5, angle)
+    assert obstacle_map.distance(x, y) > 0
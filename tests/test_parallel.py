@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from environnement import Ground
+from marker import MarkerPurpose
+
+PARAMS = dict(
+    n_colonies=3,
+    n_ants=[15, 12, 10],
+    n_warriors=[4, 6, 3],
+    n_obstacles=15,
+    n_foods=6,
+    color_food="#EAEA08",
+    epsilons=[0.9, 0.5, 0.7],
+    speed=15,
+)
+
+
+def state(model):
+    engine = model.engine
+    return (
+        engine.x.tolist(),
+        engine.y.tolist(),
+        engine.alive.tolist(),
+        [f.stock for f in model.foods],
+        [c.food_picked for c in model.colonies],
+        [markers.live("x").tolist() for markers in model.markers_dict.values()],
+    )
+
+
+@pytest.mark.parametrize("markers", ["objects", "field"])
+def test_runs_do_not_depend_on_workers(markers):
+    states = []
+    for workers in (1, 2):
+        model = Ground(
+            **PARAMS, seed=2, engine="parallel", workers=workers, markers=markers
+        )
+        # Several chunks per worker
+        model.engine.chunk_size = 8
+        for _ in range(60):
+            model.step()
+        states.append(state(model))
+        model.engine.close()
+    assert states[0] == states[1]
+
+
+def test_foods_are_not_overdrawn():
+    model = Ground(**PARAMS, seed=0, engine="parallel", workers=1)
+    model.engine.chunk_size = 4
+    for food in model.foods:
+        food.stock = 1
+    for _ in range(100):
+        model.step()
+        assert all(food.stock >= 0 for food in model.foods)
+    assert np.all(model.engine.ignore_markers_counts >= 0)
+
+
+def isolate(engine, rows):
+    # Only the agents ``rows`` are alive, each one planned in its own chunk
+    engine.chunk_size = 1
+    engine.alive[:] = False
+    engine.alive[rows] = True
+
+
+def test_contested_food_goes_to_the_lowest_uid():
+    model = Ground(**PARAMS, seed=0, engine="parallel", workers=1)
+    engine = model.engine
+    rows = np.flatnonzero(~engine.is_warrior)[[0, 5, 20]]
+    isolate(engine, rows)
+    food = model.foods[0]
+    food.stock = 1
+    engine.x[rows], engine.y[rows] = food.x, food.y
+    engine.epsilon[rows] = 1
+    # The last chunk holds the lowest uid
+    engine.uid[rows] = [1002, 1001, 1000]
+
+    model.step()
+    assert engine.is_carrying[rows].tolist() == [False, False, True]
+    assert food.stock == 0
+
+
+def test_prey_hunted_from_two_chunks_is_killed_once():
+    model = Ground(**PARAMS, seed=0, engine="parallel", workers=1)
+    engine = model.engine
+    prey = np.flatnonzero(~engine.is_warrior & (engine.colony == 0))[0]
+    hunters = np.flatnonzero(engine.is_warrior & (engine.colony == 1))[:2]
+    isolate(engine, np.r_[prey, hunters])
+    engine.x[hunters], engine.y[hunters] = engine.x[prey], engine.y[prey]
+    lifespan = engine.lifespan[hunters].copy()
+    danger = model.markers_dict["0"]
+    before = np.count_nonzero(danger.live("purpose") == MarkerPurpose.DANGER.value)
+
+    model.step()
+    assert not engine.alive[prey]
+    assert engine.alive[hunters].all()
+    assert (lifespan - engine.lifespan[hunters]).tolist() in ([1, 0], [0, 1])
+    after = np.count_nonzero(danger.live("purpose") == MarkerPurpose.DANGER.value)
+    assert after == before + 1
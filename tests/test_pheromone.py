@@ -0,0 +1,34 @@
+import numpy as np
+
+from marker import LIFETIME, MarkerPurpose
+from pheromone import PheromoneField
+
+
+def test_sense_strongest_deposit():
+    field = PheromoneField(100, 100, n_colonies=2)
+    field.deposit(0, MarkerPurpose.FOOD, 60, 50, amount=2)
+    field.deposit(0, MarkerPurpose.FOOD, 30, 50)
+
+    (x,), (y,) = field.sense(0, MarkerPurpose.FOOD, 50, 50, 20)
+    assert (x, y) == (60, 50)
+
+    # Other colonies and purposes don't see the deposits
+    assert np.isnan(field.sense(1, MarkerPurpose.FOOD, 50, 50, 20)[0][0])
+    assert np.isnan(field.sense(0, MarkerPurpose.DANGER, 50, 50, 20)[0][0])
+
+    # Towards a colony at (20, 50), only the deposit at (30, 50) counts
+    (x,), _ = field.sense(0, MarkerPurpose.FOOD, 50, 50, 20, towards=(20, 50))
+    assert x == 30
+
+
+def test_deposits_evaporate_after_lifetime():
+    field = PheromoneField(100, 100, n_colonies=1)
+    field.deposit(0, MarkerPurpose.FOOD, np.array([10, 20]), np.array([10, 20]))
+
+    for _ in range(LIFETIME - 1):
+        field.evaporate()
+    assert field.count(0, MarkerPurpose.FOOD) == 2
+
+    field.evaporate()
+    field.evaporate()
+    assert field.count(0, MarkerPurpose.FOOD) == 0
@@ -0,0 +1,48 @@
+import pytest
+
+from environnement import Ground
+from profiler import COUNTERS, STEP_PHASES
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 7],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.3],
+    speed=15,
+)
+
+
+def test_profiling_does_not_change_the_run():
+    plain = Ground(**PARAMS, seed=2)
+    profiled = Ground(**PARAMS, seed=2, profile=True)
+    assert plain.profiler is None
+    for _ in range(10):
+        plain.step()
+        profiled.step()
+
+    assert [(a.x, a.y) for a in plain.schedule.agents] == [
+        (a.x, a.y) for a in profiled.schedule.agents
+    ]
+
+
+def test_summary_and_reporters():
+    model = Ground(**PARAMS, seed=2, profile=True)
+    for _ in range(10):
+        model.step()
+
+    summary = model.profiler.summary()
+    assert summary.loc["agents", "calls"] == 10
+    assert summary.loc["Ant.step", "calls"] == 10 * 17
+    assert summary.loc["markers created", "total"] == sum(
+        markers.tail + markers.offset for markers in model.markers_dict.values()
+    )
+    assert summary.loc[list(STEP_PHASES), "share of steps"].sum() == pytest.approx(1)
+
+    df = model.datacollector.get_model_vars_dataframe()
+    assert len(df) == 10
+    assert df["Markers created"].sum() == summary.loc["markers created", "total"]
+    assert {"Time " + phase for phase in STEP_PHASES} <= set(df.columns)
+    assert {counter.capitalize() for counter in COUNTERS} <= set(df.columns)
@@ -0,0 +1,104 @@
+import pytest
+from mesa import Agent, Model
+
+from ant import Warrior
+from environnement import Ground
+from scheduler import DeferredRandomActivation, StagedRandomActivation
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 10],
+    n_warriors=[6, 8],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.5],
+    speed=15,
+)
+
+
+class Killer(Agent):
+    def __init__(self, unique_id, model, activated):
+        super().__init__(unique_id, model)
+        self.activated = activated
+
+    def step(self):
+        self.activated.append(self.unique_id)
+        for agent in self.model.schedule.agents:
+            if agent is not self:
+                self.model.schedule.kill(agent)
+
+
+def test_killed_agents_are_not_activated():
+    model = Model()
+    model.schedule = DeferredRandomActivation(model)
+    activated = []
+    for i in range(5):
+        model.schedule.add(Killer(i, model, activated))
+
+    model.schedule.step()
+    assert len(activated) == 1
+    # Dead agents stay in the schedule until remove_dead
+    assert model.schedule.get_agent_count() == 5
+    assert len(model.schedule.remove_dead()) == 4
+    assert [a.unique_id for a in model.schedule.agents] == activated
+
+
+def test_colonies_follow_the_schedule():
+    model = Ground(**PARAMS, seed=1)
+    for _ in range(150):
+        model.step()
+        assert not model.schedule.dead
+        agents = {a.unique_id: a for a in model.schedule.agents}
+        living = {}
+        for colony in model.colonies:
+            living.update(colony.ants)
+            living.update(colony.warriors)
+        assert living == agents
+        assert all(
+            a in model.ants_grid for a in agents.values() if not isinstance(a, Warrior)
+        )
+    assert len(agents) < sum(PARAMS["n_ants"]) + sum(PARAMS["n_warriors"])
+
+
+class Recorder(Agent):
+    def __init__(self, unique_id, model, kind, colony, activated):
+        super().__init__(unique_id, model)
+        self.kind, self.colony, self.activated = kind, colony, activated
+
+    def step(self):
+        self.activated.append(self.kind)
+
+
+def test_stages_are_activated_in_order():
+    model = Model()
+    model.schedule = StagedRandomActivation(
+        model,
+        ("warriors", "foragers"),
+        lambda agent: agent.kind,
+        lambda agent: agent.colony,
+    )
+    activated = []
+    for i in range(20):
+        kind = "warriors" if i % 3 else "foragers"
+        model.schedule.add(Recorder(i, model, kind, i % 2, activated))
+
+    model.schedule.step()
+    assert activated == ["warriors"] * 13 + ["foragers"] * 7
+    assert len(model.schedule.partition("warriors", 1)) == 7
+
+    model.schedule.kill(model.schedule.partition("foragers", 0)[0])
+    model.schedule.remove_dead()
+    assert 0 not in model.schedule.partition("foragers", 0)
+
+
+def test_staged_ground():
+    with pytest.raises(ValueError):
+        Ground(**PARAMS, stages=("warriors",))
+
+    model = Ground(**PARAMS, seed=1, stages=("foragers", "warriors"))
+    for _ in range(150):
+        model.step()
+    for colony in model.colonies:
+        assert model.schedule.partition("foragers", colony.id_colony) == colony.ants
+        assert model.schedule.partition("warriors", colony.id_colony) == colony.warriors
@@ -0,0 +1,73 @@
+import sweep
+from cache import ResultCache
+from sweep import run_sweep
+
+VARIABLE_PARAMETERS = {
+    "n_colonies": (2,),
+    "n_ants": ((5, 5),),
+    "n_warriors": ((1, 0), (0, 1)),
+    "n_foods": (2,),
+    "n_obstacles": (3,),
+    "color_food": ("#EAEA08",),
+    "epsilons": ((0.5, 0.5),),
+    "speed": (20,),
+}
+
+
+def test_parallel_sweep_matches_serial_sweep():
+    serial = run_sweep(VARIABLE_PARAMETERS, iterations=2, max_steps=20, seed=1)
+    parallel = run_sweep(
+        VARIABLE_PARAMETERS, iterations=2, max_steps=20, workers=2, seed=1
+    )
+
+    assert parallel.equals(serial)
+    assert list(serial.columns[: len(VARIABLE_PARAMETERS) + 1]) == [
+        *VARIABLE_PARAMETERS,
+        "Run",
+    ]
+    assert {"Food picked 0", "Ants 1"} <= set(serial.columns)
+    assert serial["Run"].tolist() == [0, 1, 2, 3]
+
+
+def test_cached_sweep_only_runs_new_points(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path)
+    expected = run_sweep(VARIABLE_PARAMETERS, iterations=2, max_steps=20, seed=1)
+    first = run_sweep(
+        VARIABLE_PARAMETERS, iterations=2, max_steps=20, seed=1, cache=cache
+    )
+    assert first.equals(expected)
+    assert len(cache) == 4
+
+    def run_point(job):
+        raise AssertionError("cached point run again")
+
+    monkeypatch.setattr(sweep, "run_point", run_point)
+    cached = run_sweep(
+        VARIABLE_PARAMETERS, iterations=2, max_steps=20, seed=1, cache=cache
+    )
+    assert cached.equals(expected)
+
+
+def test_extended_sweep_only_runs_new_values(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path)
+    run_sweep(VARIABLE_PARAMETERS, max_steps=20, seed=1, cache=cache)
+
+    ran = []
+
+    def run_point(job):
+        ran.append(job[1]["n_obstacles"])
+        return original(job)
+
+    original = sweep.run_point
+    monkeypatch.setattr(sweep, "run_point", run_point)
+    extended = run_sweep(
+        dict(VARIABLE_PARAMETERS, n_obstacles=(2, 3)),
+        max_steps=20,
+        seed=1,
+        cache=cache,
+    )
+    assert ran == [2, 2]
+    fresh = run_sweep(
+        dict(VARIABLE_PARAMETERS, n_obstacles=(2, 3)), max_steps=20, seed=1
+    )
+    assert extended.equals(fresh)
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from environnement import Ground
+from trajectory import TrajectoryRecorder, Trajectories
+
+PARAMS = dict(
+    n_colonies=2,
+    n_ants=[10, 8],
+    n_warriors=[3, 4],
+    n_obstacles=5,
+    n_foods=3,
+    color_food="#EAEA08",
+    epsilons=[0.5, 0.5],
+    speed=15,
+)
+
+
+def test_records_every_stride_steps(tmp_path):
+    path = tmp_path / "trajectories.bin"
+    model = Ground(**PARAMS, seed=1, trajectory_path=path, trajectory_stride=3)
+    uids = sorted(agent.unique_id for agent in model.schedule.agents)
+    for _ in range(30):
+        model.step()
+    model.recorder.close()
+
+    trajectories = Trajectories(path)
+    assert trajectories.uids.tolist() == uids
+    assert trajectories.steps.tolist() == list(range(0, 31, 3))
+    last = trajectories.tick(30)
+    living = {agent.unique_id: agent for agent in model.schedule.agents}
+    for uid, record in zip(uids, last):
+        if uid in living:
+            agent = living[uid]
+            assert record["alive"]
+            assert record["x"] == np.float32(agent.x)
+            assert record["carrying"] == agent.is_carrying
+        else:
+            assert not record["alive"] and np.isnan(record["x"])
+    with pytest.raises(KeyError):
+        trajectories.tick(4)
+
+
+def test_views_are_read_from_the_grown_file(tmp_path):
+    path = tmp_path / "trajectories.bin"
+    model = Ground(**PARAMS, seed=0, engine="vectorized")
+    engine = model.engine
+    # A chunk of two ticks at a time
+    recorder = TrajectoryRecorder(path, engine.uid, chunk_bytes=1)
+    recorder.chunk_ticks = 2
+    model.recorder = recorder
+    xs = []
+    for _ in range(7):
+        model.step()
+        xs.append(np.where(engine.alive, engine.x, np.nan).astype(np.float32))
+    recorder.close()
+
+    trajectories = Trajectories(path)
+    assert len(trajectories) == 7
+    uid = int(engine.uid[5])
+    agent = trajectories.agent(uid)
+    assert np.shares_memory(agent, trajectories.records)
+    assert np.shares_memory(trajectories.column("x"), trajectories.records)
+    np.testing.assert_array_equal(agent["x"], [x[5] for x in xs])
+    np.testing.assert_array_equal(trajectories.column("x")[-1], xs[-1])